@@ -2,6 +2,7 @@ import re
 import pandas as pd
 import numpy as np
 from PyQt5.QtCore import QThread, pyqtSignal
+from core.dtype_optimizer import DtypeOptimizer
 
 
 class AnalysisThread(QThread):
@@ -53,6 +54,8 @@ class AnalysisThread(QThread):
     def execute_cleaned_code(self, cleaned_code, data_dict):
         """执行代码并简化图表配置校验，使用预加载的数据"""
         full_code = f"{cleaned_code}\n"
+        # 生成的代码按普通文本列处理数据，分类列先还原（不修改内存缓存中的原对象）
+        data_dict = {name: DtypeOptimizer.restore_categories(df) for name, df in data_dict.items()}
         local_vars = {
             'data_dict': data_dict,
             'pd': pd,
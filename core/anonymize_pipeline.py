@@ -0,0 +1,235 @@
+import io
+import os
+import json
+import pandas as pd
+from utils.helpers import sanitize_filename, split_extension
+from core.column_anonymizer import ColumnAnonymizer
+from core.compression import OPENERS, open_text
+from core.encoding_detector import confirm_encoding, detect_encoding
+from core.file_processors import FileProcessor, JsonFileProcessor
+
+
+class AnonymizePipeline:
+    """流式分块去敏管道：CSV/TXT/LOG/NDJSON按固定行数分块读取、去敏并追加写出，
+    峰值内存只与块大小相关；其他格式整文件处理。.gz/.bz2/.xz 压缩文件边解压边处理，
+    输出按同一格式压缩。JSON与NDJSON按解析出的对象去敏，写回时保持原有的嵌套结构和文件布局"""
+
+    STREAM_EXTENSIONS = ['.csv', '.txt', '.log', '.jsonl', '.ndjson']
+    JSON_LINES_EXTENSIONS = ['.jsonl', '.ndjson']
+    DEFAULT_CHUNK_SIZE = 50000
+
+    def __init__(self, processor, chunk_size=None, streaming=None, progress_callback=None):
+        """
+        Args:
+            processor: LogAIProcessor实例
+            chunk_size: 每块行数，默认读取配置 anonymize_chunk_size
+            streaming: 是否启用流式模式，默认读取配置 stream_anonymize
+            progress_callback: 进度回调 (已处理字节, 总字节, 当前文件名)
+        """
+        self.processor = processor
+        config = processor.config
+        self.chunk_size = max(1, int(chunk_size or config.get("anonymize_chunk_size", self.DEFAULT_CHUNK_SIZE)))
+        self.streaming = config.get("stream_anonymize", True) if streaming is None else streaming
+        self.progress_callback = progress_callback
+        self.total_bytes = 0
+        self.done_bytes = 0
+        # 任务开始时取得词典快照，处理期间词典的修改不影响本次输出
+        self.snapshot = processor.sensitive_processor.snapshot
+        self.column_anonymizer = ColumnAnonymizer(
+            lambda text: processor._anonymize_text(text, self.snapshot)
+        )
+
+    def run(self, file_names, output_dir):
+        """处理所有文件，返回 {文件名: 输出路径}"""
+        jobs = self.prepare_jobs(file_names, output_dir)
+
+        results = {}
+        for safe_file, full_path, output_path in jobs:
+            self._report(0, safe_file)
+            try:
+                self._process_file(safe_file, full_path, output_path)
+            except Exception as e:
+                raise RuntimeError(f"去敏文件 {safe_file} 失败: {str(e)}")
+            results[safe_file] = output_path
+
+        if self.snapshot.detector:
+            self.snapshot.detector.flush()
+        return results
+
+    def prepare_jobs(self, file_names, output_dir):
+        """校验输入并生成任务列表 [(文件名, 完整路径, 输出路径)]，同时重置进度"""
+        if not file_names:
+            raise ValueError("未选择文件")
+
+        if not output_dir or not os.path.exists(output_dir):
+            raise ValueError("无效的输出目录")
+
+        jobs = []
+        for file_name in file_names:
+            safe_file = sanitize_filename(file_name)
+            full_path = os.path.join(self.processor.current_data_dir, safe_file)
+            if not os.path.exists(full_path):
+                raise FileNotFoundError(f"文件不存在: {full_path}")
+            jobs.append((safe_file, full_path, self.get_output_path(safe_file, output_dir)))
+
+        self.total_bytes = sum(os.path.getsize(full_path) for _, full_path, _ in jobs) or 1
+        self.done_bytes = 0
+        return jobs
+
+    @staticmethod
+    def get_output_path(file_name, output_dir):
+        """去敏文件输出路径：原文件名_anonymized.扩展名（压缩文件保留压缩扩展名，如 app_anonymized.log.gz）"""
+        ext, compression = split_extension(file_name)
+        base_name = file_name[:len(file_name) - len(ext) - len(compression)]
+        return os.path.join(output_dir, f"{base_name}_anonymized{file_name[len(base_name):]}")
+
+    def _report(self, file_bytes, file_name):
+        """汇报进度，file_bytes为当前文件已处理字节数"""
+        if self.progress_callback:
+            self.progress_callback(min(self.done_bytes + file_bytes, self.total_bytes),
+                                   self.total_bytes, file_name)
+
+    def _process_file(self, file_name, full_path, output_path):
+        ext, _ = split_extension(file_name)
+        file_size = os.path.getsize(full_path)
+
+        if ext == '.json' or (ext in self.JSON_LINES_EXTENSIONS and not self.streaming):
+            self.anonymize_json_file(self.column_anonymizer, full_path, output_path,
+                                     self.processor.supported_encodings, self.chunk_size)
+        elif self.streaming and ext == '.csv':
+            try:
+                self._write_chunks(self._iter_csv_chunks(full_path), output_path, ext, file_name)
+            except pd.errors.ParserError:
+                # C解析器无法处理的不规则文件，改用python引擎重新输出
+                self._write_chunks(self._iter_csv_chunks(full_path, engine='python'),
+                                   output_path, ext, file_name)
+        elif self.streaming and ext in self.JSON_LINES_EXTENSIONS:
+            self._write_chunks(self._iter_record_chunks(full_path), output_path, ext, file_name)
+        elif self.streaming and ext in self.STREAM_EXTENSIONS:
+            self._write_chunks(self._iter_text_chunks(full_path), output_path, ext, file_name)
+        else:
+            self._process_whole_file(file_name, output_path, ext)
+
+        self.done_bytes += file_size
+        self._report(0, file_name)
+
+    def _iter_csv_chunks(self, full_path, engine='c'):
+        """按块读取CSV，产出 (DataFrame块, 已读取字节数)"""
+        reader = self.processor.extension_map['.csv']
+        for chunk in reader.iter_chunks(full_path, self.chunk_size,
+                                        encodings=self.processor.supported_encodings, engine=engine):
+            yield chunk, chunk.attrs["bytes_read"]
+
+    def _iter_record_chunks(self, full_path):
+        """按行分块读取NDJSON原始行，产出 (行列表, 已读取字节数)；各行在去敏时才解析，不展开嵌套字段"""
+        encoding = confirm_encoding(full_path, self.processor.supported_encodings)
+        yield from FileProcessor._iter_text_lines(full_path, self.chunk_size, encoding)
+
+    def _iter_text_chunks(self, full_path):
+        """按行分块读取文本日志，产出 (行列表, 已读取字节数)"""
+        reader = self.processor.extension_map[split_extension(full_path)[0]]
+        for chunk in reader.iter_chunks(full_path, self.chunk_size,
+                                        encodings=self.processor.supported_encodings):
+            yield chunk.iloc[:, 0].tolist(), chunk.attrs["bytes_read"]
+
+    def anonymize_chunk(self, chunk, ext=None):
+        """对单个数据块去敏：DataFrame按列处理，NDJSON行按记录处理，其他行列表按唯一行处理"""
+        if isinstance(chunk, pd.DataFrame):
+            return self.processor._anonymize_dataframe(chunk, self.snapshot)
+        if ext in self.JSON_LINES_EXTENSIONS:
+            return self.anonymize_records(self.column_anonymizer, chunk)
+
+        series = pd.Series(chunk, dtype=object)
+        anonymized, _ = self.column_anonymizer.anonymize_series(series)
+        return anonymized.tolist()
+
+    def _write_chunks(self, chunks, output_path, ext, file_name):
+        """逐块去敏并追加写入输出文件"""
+        with self.open_output(output_path, ext) as out:
+            first = True
+            for chunk, bytes_read in chunks:
+                self.write_chunk(out, self.anonymize_chunk(chunk, ext), ext, first)
+                first = False
+                self._report(bytes_read, file_name)
+
+    @staticmethod
+    def open_output(output_path, ext):
+        if ext == '.csv':
+            # 只在文件开头写入一次BOM
+            return open_text(output_path, 'w', encoding='utf-8-sig', newline='')
+        return open_text(output_path, 'w', encoding='utf-8')
+
+    @staticmethod
+    def write_chunk(out, chunk, ext, first):
+        if ext == '.csv':
+            chunk.to_csv(out, index=False, header=first)
+        elif ext in AnonymizePipeline.JSON_LINES_EXTENSIONS:
+            # 每行一条记录，每块以换行结尾，下一块直接追加
+            out.write("".join(line + "\n" for line in chunk))
+        else:
+            # 与整文件模式一致：行间以换行分隔，文件末尾不追加换行
+            if not first:
+                out.write("\n")
+            out.write("\n".join(chunk))
+
+    @staticmethod
+    def anonymize_records(column_anonymizer, lines):
+        """NDJSON行去敏：对象和数组按原结构逐个字符串去敏后重新序列化，
+        其余行（标量、空行、无法解析的行）按原文去敏，返回输出行列表"""
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line, strict=False)
+            except ValueError:
+                record = None
+            records.append(record if isinstance(record, (dict, list)) else line)
+        anonymized, _ = column_anonymizer.anonymize_series(pd.Series(records, dtype=object))
+        return [value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+                for value in anonymized]
+
+    @classmethod
+    def anonymize_json_file(cls, column_anonymizer, full_path, output_path, encodings, chunk_size):
+        """整文件去敏JSON/NDJSON并保持原有布局：每行一个对象的文件逐行写回，
+        其他JSON文档整体解析后遍历其中的字符串去敏，按原结构写出"""
+        ext, _ = split_extension(full_path)
+        with open_text(output_path, 'w', encoding='utf-8') as out:
+            if ext in cls.JSON_LINES_EXTENSIONS or JsonFileProcessor.is_json_lines(
+                    full_path, detect_encoding(full_path, encodings)):
+                encoding = confirm_encoding(full_path, encodings)
+                for lines, _ in FileProcessor._iter_text_lines(full_path, chunk_size, encoding):
+                    cls.write_chunk(out, cls.anonymize_records(column_anonymizer, lines), '.jsonl', False)
+                return
+            document = JsonFileProcessor.load_document(full_path, encodings)
+            anonymized, _ = column_anonymizer.anonymize_series(pd.Series([document], dtype=object))
+            json.dump(anonymized.iloc[0], out, ensure_ascii=False)
+
+    def _process_whole_file(self, file_name, output_path, ext):
+        """非流式格式（Excel/JSON）整文件读取、去敏并保存
+
+        直接读取原始数据而不经过加载缓存：缓存中的数据已做类型压缩（时间列解析为日期类型），
+        写回时会改变原文的时间格式
+        """
+        full_path, reader = self.processor.get_file_processor(file_name)
+        df = reader.load(full_path, encodings=self.processor.supported_encodings)
+        self.save_dataframe(self.processor._anonymize_dataframe(df, self.snapshot), output_path, ext)
+
+    @staticmethod
+    def save_dataframe(anonymized_df, output_path, ext):
+        """根据文件类型保存整个去敏后的DataFrame（CSV/JSON按输出路径的压缩扩展名自动压缩）"""
+        compression = split_extension(output_path)[1]
+        if ext in ['.csv']:
+            anonymized_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        elif ext in ['.xlsx', '.xls'] and compression:
+            # 工作簿写入需要随机访问，先在内存中生成再整体压缩
+            buffer = io.BytesIO()
+            anonymized_df.to_excel(buffer, index=False, engine='openpyxl')
+            with OPENERS[compression](output_path, 'wb') as f:
+                f.write(buffer.getvalue())
+        elif ext in ['.xlsx', '.xls']:
+            anonymized_df.to_excel(output_path, index=False)
+        elif ext in ['.json']:
+            anonymized_df.to_json(output_path, orient='records', force_ascii=False)
+        else:  # 文本文件
+            content = "\n".join(anonymized_df.iloc[:, 0].astype(str).tolist())
+            with open_text(output_path, 'w', encoding='utf-8') as f:
+                f.write(content)
@@ -18,12 +18,13 @@ class DeepSeekAPI:
         if not prompt:
             raise ValueError("prompt不能为空")
 
-        # 敏感词替换
+        # 敏感词替换（替换与还原使用同一词典快照，避免请求期间词典变更导致无法还原）
         replace_count = None
         processed_prompt = prompt
+        snapshot = None
         if self.sensitive_processor:
-
-            processed_prompt, replace_count = self.sensitive_processor.replace_sensitive_words(prompt)
+            snapshot = self.sensitive_processor.snapshot
+            processed_prompt, replace_count = self.sensitive_processor.replace_sensitive_words(prompt, snapshot)
 
             # 显示处理后的请求
 
@@ -46,7 +47,7 @@ class DeepSeekAPI:
                 # 敏感词还原
                 if self.sensitive_processor and response.choices[0].message.content:
                     response.choices[0].message.content = self.sensitive_processor.restore_sensitive_words(
-                        response.choices[0].message.content
+                        response.choices[0].message.content, snapshot
                     )
 
                 return response
@@ -0,0 +1,144 @@
+import time
+import numpy as np
+import pandas as pd
+
+
+class ColumnAnonymizer:
+    """列式去重去敏引擎：按列因子化，只对唯一值去敏后按编码映射回原列"""
+
+    def __init__(self, anonymize_func):
+        """
+        Args:
+            anonymize_func: 单个字符串的去敏函数 (str -> str)
+        """
+        self.anonymize_func = anonymize_func
+
+    @staticmethod
+    def is_text_column(series):
+        """判断是否为需要去敏的文本列（object、字符串或分类类型）"""
+        dtype = series.dtype
+        return (pd.api.types.is_object_dtype(dtype) or isinstance(dtype, pd.StringDtype)
+                or isinstance(dtype, pd.CategoricalDtype))
+
+    def anonymize_series(self, series):
+        """对单列去敏，空值和非字符串单元格保持不变
+
+        Returns:
+            tuple: (去敏后的Series, 统计信息字典)
+        """
+        start = time.perf_counter()
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return self._anonymize_categorical(series, start)
+
+        rows = len(series)
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            # 含列表、字典等不可哈希的单元格（JSON数组、嵌套对象）
+            return self._anonymize_containers(series, start)
+        uniques = np.asarray(uniques, dtype=object)
+
+        # 只对唯一的字符串值调用去敏函数
+        new_uniques = np.empty(len(uniques) + 1, dtype=object)
+        changed = np.zeros(len(uniques) + 1, dtype=bool)  # 末位对应空值编码 -1
+        for i, value in enumerate(uniques):
+            if isinstance(value, str):
+                new_value = self.anonymize_func(value)
+                if new_value != value:
+                    new_uniques[i] = new_value
+                    changed[i] = True
+
+        result = series
+        cell_mask = changed[codes]
+        if cell_mask.any():
+            values = series.to_numpy(dtype=object, copy=True)
+            values[cell_mask] = new_uniques[codes[cell_mask]]
+            dtype = series.dtype if isinstance(series.dtype, pd.StringDtype) else object
+            result = pd.Series(values, index=series.index, name=series.name, dtype=dtype)
+
+        return result, self._stats(rows, len(uniques), int(changed.sum()), start)
+
+    def _anonymize_containers(self, series, start):
+        """标量单元格照常因子化去敏；列表、字典单元格逐个遍历其中的字符串去敏，保持原有结构和类型"""
+        containers = series.map(self._is_unhashable).to_numpy(dtype=bool)
+        scalars, stats = self.anonymize_series(series[~containers])
+
+        values = series.to_numpy(dtype=object, copy=True)
+        values[~containers] = scalars.to_numpy(dtype=object)
+        # 同一字符串在不同单元格中只去敏一次
+        leaves = {}
+        for i in np.flatnonzero(containers):
+            values[i] = self._anonymize_nested(values[i], leaves)
+
+        changed = stats["changed_values"] + sum(1 for old, new in leaves.items() if new != old)
+        result = pd.Series(values, index=series.index, name=series.name, dtype=object)
+        return result, self._stats(len(series), stats["unique"] + len(leaves), changed, start)
+
+    def _anonymize_nested(self, value, leaves):
+        if isinstance(value, str):
+            if value not in leaves:
+                leaves[value] = self.anonymize_func(value)
+            return leaves[value]
+        if isinstance(value, dict):
+            return {key: self._anonymize_nested(item, leaves) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._anonymize_nested(item, leaves) for item in value]
+        if isinstance(value, tuple):
+            return tuple(self._anonymize_nested(item, leaves) for item in value)
+        return value
+
+    @staticmethod
+    def _is_unhashable(value):
+        try:
+            hash(value)
+            return False
+        except TypeError:
+            return True
+
+    def _anonymize_categorical(self, series, start):
+        """分类列只对类别去敏，去敏后相同的类别合并，编码随之重映射"""
+        categories = series.cat.categories
+        new_values = [self.anonymize_func(value) if isinstance(value, str) else value
+                      for value in categories]
+        changed = sum(1 for old, new in zip(categories, new_values) if new != old)
+
+        result = series
+        if changed:
+            remap, new_categories = pd.factorize(pd.Index(new_values, dtype=object))
+            codes = series.cat.codes.to_numpy()
+            new_codes = np.where(codes >= 0, remap[codes], -1)
+            result = pd.Series(pd.Categorical.from_codes(new_codes, categories=new_categories),
+                               index=series.index, name=series.name)
+        return result, self._stats(len(series), len(categories), changed, start)
+
+    @staticmethod
+    def _stats(rows, unique, changed_values, start):
+        seconds = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "unique": unique,
+            "unique_ratio": unique / rows if rows else 0.0,
+            "changed_values": changed_values,
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else float(rows)
+        }
+
+    def anonymize_dataframe(self, df):
+        """对DataFrame中所有文本列去敏
+
+        Returns:
+            tuple: (去敏后的DataFrame副本, {列名: 统计信息})
+        """
+        df_copy = df.copy()
+        column_stats = {}
+
+        for i, col in enumerate(df_copy.columns):
+            series = df_copy.iloc[:, i]
+            if not self.is_text_column(series):
+                continue
+            new_series, stats = self.anonymize_series(series)
+            if new_series is not series:
+                df_copy.isetitem(i, new_series)
+            column_stats[col] = stats
+
+        return df_copy, column_stats
@@ -0,0 +1,72 @@
+import io
+import bz2
+import gzip
+import lzma
+from utils.helpers import split_extension
+
+# 压缩扩展名 -> 打开函数（均接受文件名或文件对象）
+OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+def is_compressed(file_path):
+    return bool(split_extension(file_path)[1])
+
+
+class DecompressingReader(io.RawIOBase):
+    """压缩文件的解压读取流：tell() 为已解压的字节数，source 为底层压缩文件"""
+
+    def __init__(self, file_path, compression):
+        self.source = open(file_path, 'rb')
+        try:
+            self._stream = OPENERS[compression](self.source, 'rb')
+        except BaseException:
+            self.source.close()
+            raise
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._stream.readinto(buffer)
+        self._position += count
+        return count
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+            self.source.close()
+        super().close()
+
+
+def open_binary(file_path):
+    """以二进制只读方式打开文件，压缩文件按扩展名边读边解压，不落地临时文件"""
+    compression = split_extension(file_path)[1]
+    if not compression:
+        return open(file_path, 'rb')
+    return io.BufferedReader(DecompressingReader(file_path, compression), buffer_size=1024 * 1024)
+
+
+def open_text(file_path, mode='r', encoding='utf-8', errors=None, newline=None):
+    """打开文本文件：读取时透明解压，写入时按扩展名压缩（如输出 app_anonymized.log.gz）"""
+    compression = split_extension(file_path)[1]
+    if not compression:
+        return open(file_path, mode, encoding=encoding, errors=errors, newline=newline)
+    if 'r' in mode:
+        return io.TextIOWrapper(open_binary(file_path), encoding=encoding, errors=errors, newline=newline)
+    return OPENERS[compression](file_path, mode.replace('t', '') + 't',
+                                encoding=encoding, errors=errors, newline=newline)
+
+
+def source_position(f):
+    """已从磁盘读取的字节数：压缩文件为压缩数据的位置，用于按文件大小计算进度"""
+    raw = getattr(f, 'raw', None)
+    source = getattr(raw, 'source', None)
+    return (source or f).tell()
@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class DataFrameCache:
+    """按文件缓存已加载的DataFrame：总内存受预算限制，超出时淘汰最久未使用的文件，
+    文件大小或修改时间变化后自动失效。同一文件的多个数据（如Excel的各个工作表）用不同的键区分"""
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes: 内存预算（字节），按 memory_usage(deep=True) 计算
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        # 键（默认为完整路径） -> (文件大小, 修改时间, DataFrame, 占用字节)，末尾为最近使用
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(full_path):
+        stat = os.stat(full_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, full_path, key=None):
+        """返回缓存的DataFrame，未缓存或文件已变化时返回None"""
+        key = key or full_path
+        try:
+            signature = self._signature(full_path)
+        except OSError:
+            signature = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[:2] != signature:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, full_path, df, key=None):
+        """缓存DataFrame；单个文件超过预算时不缓存"""
+        key = key or full_path
+        try:
+            size, mtime = self._signature(full_path)
+        except OSError:
+            return
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if nbytes > self.max_bytes:
+                return
+            while self._entries and self.total_bytes + nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+            self._entries[key] = (size, mtime, df, nbytes)
+            self.total_bytes += nbytes
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """命中统计：{"hits", "misses", "files", "bytes"}"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "files": len(self._entries),
+                "bytes": self.total_bytes
+            }
@@ -0,0 +1,161 @@
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    from pandas.core.tools.datetimes import guess_datetime_format
+
+
+class DtypeOptimizer:
+    """加载后的列类型压缩：低基数文本列转为分类类型，浮点列无损降位，时间文本解析为日期类型；
+    整数列默认保持int64，降位需显式开启（int8等窄类型在累加、相乘时会静默溢出）
+
+    每列的时间格式只推断一次并按列名缓存，同名列（同一文件再次加载、同类文件）直接复用。
+    """
+
+    CATEGORY_MAX_RATIO = 0.5  # 唯一值占比不超过该值的文本列转为分类类型
+    TIMESTAMP_SAMPLE_SIZE = 200  # 推断时间格式时抽取的非空值数量
+    TIMESTAMP_MIN_RATIO = 0.95  # 样本中至少该比例能按推断格式解析才尝试整列转换
+
+    def __init__(self, category_max_ratio=None, parse_timestamps=True, downcast_integers=False):
+        """
+        Args:
+            category_max_ratio: 转为分类类型的唯一值占比上限，默认 CATEGORY_MAX_RATIO
+            parse_timestamps: 是否把时间文本列解析为日期类型
+            downcast_integers: 是否把整数列降为能容纳其取值的最窄类型
+        """
+        self.category_max_ratio = self.CATEGORY_MAX_RATIO if category_max_ratio is None else category_max_ratio
+        self.parse_timestamps = parse_timestamps
+        self.downcast_integers = downcast_integers
+        # {列名: 时间格式}
+        self.formats = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # 锁不能跨进程传递；已缓存的时间格式随参数一起带到工作进程
+        return self._restore, (self.category_max_ratio, self.parse_timestamps, self.downcast_integers,
+                               dict(self.formats))
+
+    @classmethod
+    def _restore(cls, category_max_ratio, parse_timestamps, downcast_integers, formats):
+        optimizer = cls(category_max_ratio, parse_timestamps, downcast_integers)
+        optimizer.formats.update(formats)
+        return optimizer
+
+    @staticmethod
+    def memory_usage(df):
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def optimize(self, df):
+        """压缩DataFrame各列类型，返回新的DataFrame（不修改原对象）
+
+        Returns:
+            tuple: (DataFrame, {"before", "after", "columns": {列名: 新类型}})
+        """
+        before = self.memory_usage(df)
+        result = df.copy(deep=False)
+        converted = {}
+
+        for i, col in enumerate(result.columns):
+            series = result.iloc[:, i]
+            new_series = self.optimize_series(series)
+            if new_series is not series:
+                result.isetitem(i, new_series)
+                converted[col] = str(new_series.dtype)
+
+        return result, {"before": before, "after": self.memory_usage(result), "columns": converted}
+
+    def optimize_series(self, series):
+        """压缩单列，无可压缩时原样返回"""
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            return series
+        if pd.api.types.is_integer_dtype(dtype):
+            return pd.to_numeric(series, downcast='integer') if self.downcast_integers else series
+        if pd.api.types.is_float_dtype(dtype):
+            return self._downcast_float(series)
+        if pd.api.types.is_object_dtype(dtype) or isinstance(dtype, pd.StringDtype):
+            if self.parse_timestamps:
+                parsed = self._parse_timestamps(series)
+                if parsed is not None:
+                    return parsed
+            return self._to_category(series)
+        return series
+
+    @staticmethod
+    def _downcast_float(series):
+        # 只在float32能精确表示所有值时降位，避免改变数值
+        if series.dtype != np.float64:
+            return series
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrowed, index=series.index, name=series.name)
+        return series
+
+    def _to_category(self, series):
+        rows = len(series)
+        if rows == 0:
+            return series
+        try:
+            unique = series.nunique(dropna=True)
+        except TypeError:
+            # 列表、字典等不可哈希的单元格
+            return series
+        if unique == 0 or unique / rows > self.category_max_ratio:
+            return series
+        return series.astype('category')
+
+    def _parse_timestamps(self, series):
+        """按推断的单一格式整列解析时间文本；任一非空值无法解析时保留原文本"""
+        name = series.name
+        with self._lock:
+            cached = self.formats.get(name)
+
+        sample = series.dropna().head(self.TIMESTAMP_SAMPLE_SIZE)
+        if sample.empty or not all(isinstance(value, str) for value in sample):
+            return None
+
+        fmt = cached if cached and self._matches(sample, cached) else self._infer_format(sample)
+        if fmt is None:
+            return None
+
+        parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+        if parsed.isna().sum() != series.isna().sum():
+            return None
+        with self._lock:
+            self.formats[name] = fmt
+        return parsed
+
+    def _infer_format(self, sample):
+        value = sample.iloc[0].strip()
+        # 纯数字（编号、时间戳数值）不按日期处理
+        if not value or value.isdigit() or not any(c.isdigit() for c in value):
+            return None
+        fmt = guess_datetime_format(value)
+        if fmt is None or not self._matches(sample, fmt):
+            return None
+        return fmt
+
+    def _matches(self, sample, fmt):
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        return parsed.notna().mean() >= self.TIMESTAMP_MIN_RATIO
+
+    @staticmethod
+    def restore_categories(df):
+        """把分类列还原为其类别的原类型（通常为文本），返回新的DataFrame；没有分类列时原样返回。
+        交给生成代码前调用：对分类列赋新值、fillna 等常见写法会因值不在类别中而报错"""
+        positions = [i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.CategoricalDtype)]
+        if not positions:
+            return df
+        result = df.copy(deep=False)
+        for i in positions:
+            series = result.iloc[:, i]
+            result.isetitem(i, series.astype(series.cat.categories.dtype))
+        return result
+
+    def clear_formats(self):
+        with self._lock:
+            self.formats.clear()
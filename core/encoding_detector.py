@@ -0,0 +1,180 @@
+import os
+import codecs
+import threading
+from core.compression import open_binary
+
+# 默认候选编码，按优先级排列
+DEFAULT_ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'utf-16-le']
+SAMPLE_SIZE = 65536
+VERIFY_BLOCK_SIZE = 1024 * 1024  # 整文件验证编码时每次解码的字节数
+
+# BOM检测顺序：UTF-32的BOM以UTF-16的BOM开头，需先判断
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# (绝对路径, 文件大小, 修改时间) -> 编码；文件变化后键随之变化，旧条目自然失效
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(file_path):
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+
+def _valid_codecs(candidates):
+    """过滤当前平台不存在的编码（如Linux上的'ansi'），并按codec去重"""
+    valid = []
+    seen = set()
+    for encoding in candidates:
+        try:
+            name = codecs.lookup(encoding).name
+        except LookupError:
+            continue
+        if name not in seen:
+            seen.add(name)
+            valid.append(encoding)
+    return valid
+
+
+def _is_wide(encoding):
+    return codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+
+def _sniff_utf16(sample, candidates):
+    """无BOM时根据空字节分布识别UTF-16：ASCII字符的高位字节为0"""
+    if len(sample) < 4:
+        return None
+    even_nul = sample[0::2].count(0)
+    odd_nul = sample[1::2].count(0)
+    half = len(sample) // 2
+    if odd_nul > half * 0.3 and odd_nul > even_nul * 4:
+        preferred = ['utf-16-le', 'utf-16']
+    elif even_nul > half * 0.3 and even_nul > odd_nul * 4:
+        preferred = ['utf-16-be']
+    else:
+        return None
+
+    names = {codecs.lookup(e).name: e for e in candidates}
+    for encoding in preferred:
+        name = codecs.lookup(encoding).name
+        if name in names:
+            return names[name]
+    return preferred[0]
+
+
+def _probe(sample, candidates, final):
+    """返回第一个能解码样本的候选编码；样本截断处的不完整多字节字符不视为错误"""
+    if b'\x00' not in sample:
+        # 不含空字节的文本不可能是UTF-16/32，跳过以免误判
+        candidates = [e for e in candidates if not _is_wide(e)]
+    for encoding in candidates:
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            decoder.decode(sample, final=final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def sniff_encoding(sample, candidates=None, final=False):
+    """根据字节样本判断编码：BOM > UTF-16空字节特征 > 候选编码解码探测
+
+    Args:
+        sample: 文件开头的字节
+        candidates: 候选编码列表
+        final: 样本是否为完整文件内容
+    Returns:
+        str: 编码名；都无法解码时返回 'utf-8'（调用方应以 errors='replace' 读取）
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    candidates = _valid_codecs(candidates or DEFAULT_ENCODINGS)
+    return (_sniff_utf16(sample, candidates)
+            or _probe(sample, candidates, final)
+            or 'utf-8')
+
+
+def detect_encoding(file_path, candidates=None, sample_size=SAMPLE_SIZE):
+    """检测文件编码：只读取一次文件前缀，结果按 (路径, 大小, 修改时间) 缓存"""
+    key = _cache_key(file_path)
+    with _cache_lock:
+        encoding = _cache.get(key)
+    if encoding:
+        return encoding
+
+    sample = _read_sample(file_path, sample_size)
+    encoding = sniff_encoding(sample, candidates, final=len(sample) < sample_size)
+
+    with _cache_lock:
+        _cache[key] = encoding
+    return encoding
+
+
+def _read_sample(file_path, sample_size=SAMPLE_SIZE):
+    # 压缩文件按解压后的内容探测
+    with open_binary(file_path) as f:
+        return f.read(sample_size)
+
+
+def remember_encoding(file_path, encoding):
+    """记录实际读取成功的编码（探测结果被完整解析推翻时更新缓存）"""
+    try:
+        key = _cache_key(file_path)
+    except OSError:
+        return
+    with _cache_lock:
+        _cache[key] = encoding
+
+
+def candidate_encodings(file_path, candidates=None):
+    """返回按可能性排序的编码列表：探测结果在前，其余有效候选编码作为兜底；
+    文件开头不含空字节时不可能是UTF-16/32，不作为兜底（否则解析失败的文件会按UTF-16读成乱码）"""
+    candidates = _valid_codecs(candidates or DEFAULT_ENCODINGS)
+    detected = detect_encoding(file_path, candidates)
+    detected_name = codecs.lookup(detected).name
+    fallback = [e for e in candidates if codecs.lookup(e).name != detected_name]
+    if any(_is_wide(e) for e in fallback) and b'\x00' not in _read_sample(file_path):
+        fallback = [e for e in fallback if not _is_wide(e)]
+    return [detected] + fallback
+
+
+def confirm_encoding(file_path, candidates=None):
+    """返回能严格解码整个文件的第一个候选编码（探测只看文件开头）。
+    流式读取一旦产出数据块就无法换编码，读取前先逐块解码整个文件验证
+
+    Raises:
+        ValueError: 所有候选编码都无法解码
+    """
+    candidates = _valid_codecs(candidates or DEFAULT_ENCODINGS)
+    for encoding in candidate_encodings(file_path, candidates):
+        if _decodes(file_path, encoding):
+            remember_encoding(file_path, encoding)
+            return encoding
+    raise ValueError(f"文件无法按候选编码解码，已尝试编码: {candidates}")
+
+
+def _decodes(file_path, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open_binary(file_path) as f:
+            while True:
+                block = f.read(VERIFY_BLOCK_SIZE)
+                decoder.decode(block, final=not block)
+                if not block:
+                    return True
+    except UnicodeDecodeError:
+        return False
+
+
+def clear_encoding_cache():
+    with _cache_lock:
+        _cache.clear()
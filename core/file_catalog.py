@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+from utils.helpers import get_cache_dir, split_extension
+from core.compression import open_binary
+
+
+class FileCatalog:
+    """数据目录的文件目录：os.scandir 一次遍历取得文件名与大小、修改时间，
+    每个文件的格式与估算行数按 (大小, 修改时间) 缓存并持久化到 cache/file_catalog，
+    重新扫描时只处理新增和变化的文件，结果以增删改的形式汇报，供界面增量更新。
+
+    不是线程安全的：同一时间只应由一个线程（后台扫描线程）调用。
+    """
+
+    FORMAT = 1  # 缓存格式版本，结构变化时递增使旧缓存失效
+    SAMPLE_SIZE = 16384  # 估算行数时读取的文件开头字节数
+    ROW_FORMATS = ('csv', 'txt', 'log', 'jsonl', 'ndjson')  # 按行存储、可估算行数的格式
+
+    def __init__(self, directory, cache_dir=None):
+        """
+        Args:
+            directory: 数据目录
+            cache_dir: 元数据持久化目录，默认 cache/file_catalog
+        """
+        self.directory = directory
+        self.cache_dir = cache_dir or get_cache_dir('file_catalog')
+        # {文件名: {"size", "mtime", "format", "compression", "rows"}}；尚未估算行数的条目没有 "rows"
+        self.entries = self._load()
+        # 上次扫描汇报过的文件名，下次扫描据此计算增删
+        self.listed = set()
+        self._dirty = False
+
+    def _cache_path(self):
+        identity = os.path.abspath(self.directory)
+        return os.path.join(self.cache_dir, hashlib.sha1(identity.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self):
+        try:
+            with open(self._cache_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"加载文件目录缓存失败，将重新扫描: {str(e)}")
+            return {}
+        return data.get("entries", {}) if data.get("format") == self.FORMAT else {}
+
+    def save(self):
+        """有变化时把元数据写回缓存文件"""
+        if not self._dirty:
+            return
+        cache_path = self._cache_path()
+        tmp_path = cache_path + '.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"format": self.FORMAT, "entries": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"保存文件目录缓存失败: {str(e)}")
+
+    def scan(self):
+        """重新遍历目录，返回相对上次扫描的变化
+
+        Returns:
+            dict: {"added": {文件名: 元数据}, "updated": {文件名: 元数据}, "removed": [文件名]}
+        """
+        found = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    # 遍历期间被删除
+                    continue
+                found[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+        added, updated = {}, {}
+        for name, (size, mtime) in found.items():
+            info = self.entries.get(name)
+            changed = info is None or info["size"] != size or info["mtime"] != mtime
+            if changed:
+                ext, compression = split_extension(name)
+                info = {"size": size, "mtime": mtime, "format": ext.lstrip('.'),
+                        "compression": compression.lstrip('.')}
+                self.entries[name] = info
+                self._dirty = True
+            if name not in self.listed:
+                added[name] = dict(info)
+            elif changed:
+                updated[name] = dict(info)
+
+        removed = [name for name in self.listed if name not in found]
+        for name in [name for name in self.entries if name not in found]:
+            del self.entries[name]
+            self._dirty = True
+        self.listed = set(found)
+        return {"added": added, "updated": updated, "removed": removed}
+
+    def pending_estimates(self):
+        """返回尚未估算行数的文件名"""
+        return [name for name in self.listed if "rows" not in self.entries[name]]
+
+    def estimate_rows(self, names):
+        """估算指定文件的行数，返回 {文件名: 更新后的元数据}"""
+        updated = {}
+        for name in names:
+            info = self.entries.get(name)
+            if info is None:
+                continue
+            try:
+                info["rows"] = self._estimate(os.path.join(self.directory, name), info)
+            except (OSError, EOFError, ValueError):
+                # 文件已删除、压缩数据损坏等
+                info["rows"] = None
+            self._dirty = True
+            updated[name] = dict(info)
+        return updated
+
+    def _estimate(self, file_path, info):
+        """按文件开头的换行符密度外推行数：整个文件都在样本内时为精确值；
+        压缩文件不知道解压后的大小，只在样本覆盖全文时给出行数"""
+        if info["format"] not in self.ROW_FORMATS:
+            return None
+        with open_binary(file_path) as f:
+            sample = f.read(self.SAMPLE_SIZE)
+        if not sample:
+            return 0
+
+        lines = sample.count(b'\n')
+        complete = len(sample) < self.SAMPLE_SIZE or (not info["compression"] and len(sample) >= info["size"])
+        if complete:
+            rows = lines + (0 if sample.endswith(b'\n') else 1)
+        elif info["compression"]:
+            return None
+        else:
+            rows = int(lines * info["size"] / len(sample))
+        # CSV首行为表头
+        return max(0, rows - 1) if info["format"] == 'csv' else rows
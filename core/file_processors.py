@@ -1,11 +1,36 @@
+import io
+import os
+import time
+import codecs
+import itertools
+from collections import OrderedDict
 import pandas as pd
 import json
 from abc import ABC, abstractmethod
+from core.encoding_detector import candidate_encodings, remember_encoding, detect_encoding, confirm_encoding
+from core.compression import is_compressed, open_binary, open_text, source_position
+from core.line_index import LineIndex, ByteRangeReader, split_records, first_record_end
+from core.log_parsers import (
+    structure_events, is_windows_event_header, read_windows_event_csv,
+    detect_format, key_value_keys, DETECT_SAMPLE_LINES, KEY_VALUE_SAMPLE_LINES
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.json as pa_json
+except ImportError:
+    pa = pa_json = None
 
 
 class FileProcessor(ABC):
     """文件处理器基类，所有文件类型处理器需继承此类"""
 
+    READ_STATS_LIMIT = 256  # 读取统计只保留最近读取的文件数，处理器在整个进程内共用
+
+    def __init__(self):
+        # {文件路径: {"engine", "encoding", "rows", "bytes", "data_bytes", "seconds", ...}}，最近读取的在末尾
+        self.read_stats = OrderedDict()
+
     @abstractmethod
     def get_supported_extensions(self):
         """返回支持的文件扩展名列表（如 ['.csv']）"""
@@ -16,7 +41,7 @@ class FileProcessor(ABC):
         """读取文件并返回DataFrame
         Args:
             file_path: 文件路径
-            encodings: 尝试的编码列表
+            encodings: 候选编码列表，先按文件前缀探测出一个编码，失败时才依次尝试其余编码
             kwargs: 额外参数
         Returns:
             pd.DataFrame: 读取的数据
@@ -25,11 +50,132 @@ class FileProcessor(ABC):
         """
         pass
 
+    def load(self, file_path, encodings=None, **kwargs):
+        """读取文件并记录读取吞吐量，所有格式共用的加载入口（解析由子类的 read_file 完成）
+
+        read_file 可通过 _describe_read 在结果上附带实际使用的解析器、编码和解压后的字节数
+        """
+        start = time.perf_counter()
+        df = self.read_file(file_path, encodings=encodings, **kwargs)
+        info = df.attrs.pop("read_info", {}) if isinstance(df, pd.DataFrame) else {}
+        self._record_stats(file_path, info.get("engine"), info.get("encoding"), df,
+                           time.perf_counter() - start, info.get("data_bytes"))
+        return df
+
+    @staticmethod
+    def _describe_read(df, engine, encoding=None, data_bytes=None):
+        """记录本次读取的解析器、编码与解压后的字节数（未知时为None），由 load 取出记入读取统计"""
+        if isinstance(df, pd.DataFrame):
+            df.attrs["read_info"] = {"engine": engine, "encoding": encoding, "data_bytes": data_bytes}
+        return df
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        """按块读取文件，逐个产出DataFrame，峰值内存只与块大小相关
+
+        每块的 attrs["bytes_read"] 为读到该块末尾时已消耗的文件字节数（压缩文件为压缩数据的字节数），用于进度显示。
+        默认实现整文件读取后作为单个块产出，支持流式读取的格式应覆盖此方法。
+        Args:
+            file_path: 文件路径
+            chunksize: 每块行数
+            encodings: 候选编码列表
+        """
+        df = self.read_file(file_path, encodings=encodings, **kwargs)
+        df.attrs["bytes_read"] = os.path.getsize(file_path)
+        yield df
+
+    def plan_ranges(self, file_path, parts, encodings=None):
+        """把文件按记录边界切分为约 parts 段以便并行解析（压缩文件无法按字节定位，不支持分段）
+
+        Returns:
+            dict: 解析计划，"ranges" 为各段范围，其余为各段共用的参数（编码、表头等）；
+                  不支持分段解析的格式或文件返回None
+        """
+        return None
+
+    def read_range(self, file_path, part, plan, **kwargs):
+        """解析计划中的单个范围，返回DataFrame（在工作进程中调用）
+
+        默认实现整文件读取，只适用于单段计划；支持分段解析的格式应同时覆盖 plan_ranges 与此方法
+        """
+        encoding = plan.get("encoding")
+        return self.read_file(file_path, encodings=[encoding] if encoding else None, **kwargs)
+
+    def reconcile_ranges(self, frames, plan):
+        """检查各段独立推断的列类型，返回需要重新解析的 {段序号: read_range额外参数}"""
+        return {}
+
+    def combine_ranges(self, file_path, frames, plan):
+        """按顺序合并各段结果"""
+        return pd.concat(frames, ignore_index=True)
+
+    def _record_stats(self, file_path, engine, encoding, df, seconds, data_bytes=None):
+        """记录读取吞吐量：bytes为磁盘上的文件字节数，data_bytes为解压后的字节数（未压缩时二者相同）"""
+        file_bytes = os.path.getsize(file_path)
+        data_bytes = file_bytes if data_bytes is None else data_bytes
+        self.store_read_stats(file_path, {
+            "engine": engine,
+            "encoding": encoding,
+            "rows": len(df),
+            "bytes": file_bytes,
+            "data_bytes": data_bytes,
+            "seconds": seconds,
+            "mb_per_sec": file_bytes / 1048576 / seconds if seconds > 0 else 0.0,
+            "data_mb_per_sec": data_bytes / 1048576 / seconds if seconds > 0 else 0.0
+        })
+
+    def store_read_stats(self, file_path, stats):
+        """保存文件的读取统计，超出 READ_STATS_LIMIT 时丢弃最早的记录"""
+        self.read_stats[file_path] = stats
+        self.read_stats.move_to_end(file_path)
+        while len(self.read_stats) > self.READ_STATS_LIMIT:
+            try:
+                self.read_stats.popitem(last=False)
+            except KeyError:
+                # 其他线程已同时淘汰
+                break
+
+    @staticmethod
+    def _iter_text_lines(file_path, chunksize, encoding):
+        """按行分块读取文本，产出 (行列表, 已读取字节数)；严格解码，编码应已由 confirm_encoding 确认"""
+        with open_text(file_path, encoding=encoding) as f:
+            while True:
+                lines = list(itertools.islice(f, chunksize))
+                if not lines:
+                    break
+                yield [line.rstrip('\r\n') for line in lines], source_position(f.buffer)
+
 
 class CsvFileProcessor(FileProcessor):
+    def __init__(self, engine='auto', structured=True):
+        """
+        Args:
+            engine: 'auto' 使用C解析器；'pyarrow' 在已安装pyarrow时多线程解析；
+                    'c'/'python' 固定使用指定解析器。前两者在解析失败时自动回退到python解析器
+            structured: 是否识别Windows事件导出格式并解析为带类型的列
+        """
+        super().__init__()
+        self.engine = engine
+        self.structured = structured
+
     def get_supported_extensions(self):
         return ['.csv']
 
+    def select_engines(self, sep, engine=None):
+        """返回按优先级排列的解析器列表"""
+        engine = engine or self.engine
+        # 多字符或正则分隔符只有python解析器支持
+        if engine == 'python' or len(sep) > 1:
+            return ['python']
+        if engine == 'c':
+            return ['c']
+        if engine == 'pyarrow':
+            try:
+                import pyarrow  # noqa: F401
+                return ['pyarrow', 'c', 'python']
+            except ImportError:
+                pass
+        return ['c', 'python']
+
     def read_file(self, file_path, encodings=None, **kwargs):
         # 扩展编码列表，增加utf-16等Windows可能使用的编码
         encodings = encodings or ['utf-8', 'gbk', 'gb2312', 'ansi', 'utf-16', 'utf-16-le']
@@ -37,48 +183,236 @@ class CsvFileProcessor(FileProcessor):
         sep = kwargs.get('sep', ',')
         # 允许灵活设置表头（默认自动识别，失败则强制无表头）
         header = kwargs.get('header', 'infer')
+        engines = self.select_engines(sep, kwargs.get('engine'))
 
-        for encoding in encodings:
-            try:
-                return pd.read_csv(
-                    file_path,
-                    encoding=encoding,
-                    sep=sep,
-                    engine=kwargs.get('engine', 'python'),
-                    header=header,
-                    # 忽略空行，增强容错性
-                    skip_blank_lines=True
-                )
-            except (UnicodeDecodeError, pd.errors.ParserError) as e:
-                # 细化异常捕获，避免非编码问题被忽略
+        if self.structured and sep == ',':
+            encoding = detect_encoding(file_path, encodings)
+            with open_text(file_path, encoding=encoding, errors='replace') as f:
+                first_line = f.readline()
+            if is_windows_event_header(first_line):
+                return self._describe_read(read_windows_event_csv(file_path, encoding), 'c', encoding)
+
+        for encoding in candidate_encodings(file_path, encodings):
+            # 只有解码失败才换编码；所有解析器都无法解析（字段数不一致等）时直接报错
+            parse_error = None
+            for engine in engines:
+                try:
+                    # 压缩文件经解压流交给解析器，读完后的位置即解压后的字节数
+                    with open_binary(file_path) as f:
+                        df = pd.read_csv(f, encoding=encoding, sep=sep, header=header,
+                                         **self._engine_options(engine))
+                        data_bytes = f.tell()
+                except UnicodeDecodeError:
+                    # 编码不对，换下一个编码
+                    break
+                except (pd.errors.ParserError, ValueError) as e:
+                    # 引号不规则、字段数不一致等快速解析器无法处理的文件，换下一个解析器
+                    parse_error = e
+                    continue
+                remember_encoding(file_path, encoding)
+                return self._describe_read(df, engine, encoding, data_bytes)
+            if parse_error is not None:
+                raise ValueError(f"CSV文件解析失败（编码 {encoding}，解析器: {engines}）: {str(parse_error)}")
+        raise ValueError(f"CSV文件读取失败，已尝试编码: {encodings}，解析器: {engines}")
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        # 各块若分别推断类型，同一列在不同块中会写成不同形式（如 "007" 变为 7、整数列变为 9.0），
+        # 因此按原文读取：所有列为文本，空单元格为空字符串
+        sep = kwargs.get('sep', ',')
+        engine = kwargs.get('engine') or self.select_engines(sep)[0]
+        if engine == 'pyarrow':
+            # pyarrow解析器不支持分块读取
+            engine = 'c'
+        # 分块读取无法中途换编码，先确认整个文件可按该编码解码
+        encoding = confirm_encoding(file_path, encodings)
+
+        with open_binary(file_path) as f:
+            reader = pd.read_csv(
+                f,
+                encoding=encoding,
+                sep=sep,
+                header=kwargs.get('header', 'infer'),
+                engine=engine,
+                chunksize=chunksize,
+                dtype=str,
+                keep_default_na=False,
+                skip_blank_lines=True
+            )
+            for chunk in reader:
+                chunk.attrs["bytes_read"] = source_position(f)
+                yield chunk
+
+    def plan_ranges(self, file_path, parts, encodings=None):
+        if is_compressed(file_path):
+            return None
+        encoding = detect_encoding(file_path, encodings)
+        if codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32')):
+            # 换行符和引号为多字节，不能按字节切分
+            return None
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            first_line = f.readline()
+        if not first_line.strip() or (self.structured and is_windows_event_header(first_line)):
+            return None
+
+        # 表头只读取一次，各段按相同列名解析
+        names = pd.read_csv(file_path, encoding=encoding, encoding_errors='replace',
+                            nrows=0, engine='c').columns.tolist()
+        ranges = split_records(file_path, first_record_end(file_path), parts)
+        if len(ranges) < 2:
+            return None
+        return {"encoding": encoding, "names": names, "ranges": ranges}
+
+    def read_range(self, file_path, part, plan, dtype=None):
+        with io.BufferedReader(ByteRangeReader(file_path, *part)) as f:
+            return pd.read_csv(f, encoding=plan["encoding"], header=None,
+                               names=plan["names"], index_col=False, dtype=dtype,
+                               **self._engine_options('c'))
+
+    def reconcile_ranges(self, frames, plan):
+        """同一列在部分段推断为数值、在其他段为文本时（如编号 "00123" 与 "A-1"），
+        把非文本段的该列按文本重新解析，与整文件解析的结果一致"""
+        retry = {}
+        for col in plan["names"]:
+            kinds = {frame[col].dtype.kind for frame in frames if len(frame)}
+            if len(kinds) <= 1 or kinds <= {'i', 'u', 'f'}:
+                # 类型一致，或整数与浮点混合（合并时统一为浮点）
                 continue
-        raise ValueError(f"CSV文件读取失败，已尝试编码: {encodings}")
+            for i, frame in enumerate(frames):
+                dtype = frame[col].dtype
+                if not (pd.api.types.is_object_dtype(dtype) or isinstance(dtype, pd.StringDtype)):
+                    retry.setdefault(i, {"dtype": {}})["dtype"][col] = str
+        return retry
+
+    @staticmethod
+    def _engine_options(engine):
+        if engine == 'pyarrow':
+            # pyarrow解析器自带多线程，且不支持 skip_blank_lines 等选项（默认即忽略空行）
+            return {"engine": 'pyarrow'}
+        options = {
+            "engine": engine,
+            # 忽略空行，增强容错性
+            "skip_blank_lines": True
+        }
+        if engine == 'c':
+            # 整列统一推断类型，与python解析器结果一致
+            options["low_memory"] = False
+        return options
 
 
 class ExcelFileProcessor(FileProcessor):
+    # 文件头签名 -> 读取引擎：xlsx为ZIP包，旧版xls为OLE2复合文档
+    SIGNATURES = [
+        (b'PK\x03\x04', 'openpyxl'),
+        (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'xlrd'),
+    ]
+
     def get_supported_extensions(self):
         return ['.xlsx', '.xls']
 
+    @classmethod
+    def detect_engine(cls, file_path):
+        """按文件头判断实际格式并返回对应引擎，不依赖扩展名（如改名为.xls的xlsx文件）"""
+        with open_binary(file_path) as f:
+            head = f.read(8)
+        for signature, engine in cls.SIGNATURES:
+            if head.startswith(signature):
+                return engine
+        raise ValueError("无法识别的Excel文件格式")
+
+    @staticmethod
+    def _open_workbook(file_path):
+        """打开工作簿文件对象：工作簿需要随机访问，压缩文件解压到内存"""
+        if is_compressed(file_path):
+            with open_binary(file_path) as f:
+                return io.BytesIO(f.read())
+        return open(file_path, 'rb')
+
+    def sheet_names(self, file_path):
+        """返回工作簿中全部工作表名称"""
+        engine = self.detect_engine(file_path)
+        # 传入文件对象，避免openpyxl按扩展名拒绝
+        with self._open_workbook(file_path) as f:
+            if engine == 'openpyxl':
+                from openpyxl import load_workbook
+                # 只读模式只解析工作簿目录，不加载单元格
+                workbook = load_workbook(f, read_only=True, keep_links=False)
+                try:
+                    return list(workbook.sheetnames)
+                finally:
+                    workbook.close()
+            with pd.ExcelFile(f, engine=engine) as excel:
+                return list(excel.sheet_names)
+
     def read_file(self, file_path, **kwargs):
-        # 支持更多引擎（xlrd用于旧版xls，openpyxl用于xlsx）
-        engines = kwargs.get('engines', ['openpyxl', 'xlrd'])
+        # 按文件头选择引擎（openpyxl用于xlsx，xlrd用于旧版xls），不再逐个试错
+        engine = kwargs.get('engine') or self.detect_engine(file_path)
         sheet_name = kwargs.get('sheet_name', 0)
 
-        for engine in engines:
-            try:
-                return pd.read_excel(
-                    file_path,
+        try:
+            with self._open_workbook(file_path) as f:
+                df = pd.read_excel(
+                    f,
                     sheet_name=sheet_name,
                     engine=engine,
                     # 忽略空行
                     skiprows=lambda x: x in kwargs.get('skip_rows', []),
                     keep_default_na=False  # 避免将空字符串识别为NaN
                 )
-            except (ValueError, ImportError, pd.errors.ParserError) as e:
-                continue
-        raise ValueError(f"Excel文件读取失败，已尝试引擎: {engines}")
+                # 压缩文件已整体解压到内存
+                data_bytes = f.getbuffer().nbytes if is_compressed(file_path) else None
+            return self._describe_read(df, engine, data_bytes=data_bytes)
+        except ImportError as e:
+            raise ValueError(f"Excel文件读取失败，缺少引擎 {engine}: {str(e)}")
+        except (ValueError, KeyError, pd.errors.ParserError) as e:
+            raise ValueError(f"Excel文件读取失败（引擎 {engine}）: {str(e)}")
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        # 旧版xls没有流式接口，整文件读取
+        if self.detect_engine(file_path) != 'openpyxl':
+            yield from super().iter_chunks(file_path, chunksize, encodings, **kwargs)
+            return
+
+        from openpyxl import load_workbook
+
+        file_size = os.path.getsize(file_path)
+        sheet_name = kwargs.get('sheet_name', 0)
+        # 只读模式按行解析工作表XML，不在内存中构建整个工作簿
+        f = self._open_workbook(file_path)
+        workbook = load_workbook(f, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = (workbook.worksheets[sheet_name] if isinstance(sheet_name, int)
+                     else workbook[sheet_name])
+            total_rows = sheet.max_row or 0
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+
+            rows_done = 1
+            while True:
+                batch = list(itertools.islice(rows, chunksize))
+                if not batch:
+                    break
+                rows_done += len(batch)
+                # 与 read_file 的 keep_default_na=False 一致：空单元格为空字符串；
+                # 保持单元格原值，避免含空单元格的整数列在部分块中变为浮点
+                chunk = pd.DataFrame(batch, columns=columns, dtype=object).fillna('')
+                # xlsx为压缩格式，按已读行数估算字节进度
+                chunk.attrs["bytes_read"] = (min(file_size, file_size * rows_done // total_rows)
+                                             if total_rows else 0)
+                yield chunk
+        finally:
+            workbook.close()
+            f.close()
+
 
 class JsonFileProcessor(FileProcessor):
+    def __init__(self):
+        super().__init__()
+        # 每行一个对象的.json文件交给NDJSON处理器按批解析
+        self.lines_processor = NdjsonFileProcessor()
+
     def get_supported_extensions(self):
         return ['.json']
 
@@ -86,41 +420,326 @@ class JsonFileProcessor(FileProcessor):
         encodings = encodings or ['utf-8', 'gbk', 'gb2312', 'ansi', 'utf-16']
         # 允许设置JSON解析的严格模式（默认非严格，兼容更多格式）
         strict = kwargs.get('strict', False)
+        if self.is_json_lines(file_path, detect_encoding(file_path, encodings)):
+            return self.lines_processor.read_file(file_path, encodings=encodings, **kwargs)
 
-        for encoding in encodings:
+        data = self.load_document(file_path, encodings, strict)
+        # load_document 已记下实际使用的编码
+        encoding = detect_encoding(file_path, encodings)
+        # 支持更多JSON结构（如嵌套字典）
+        if isinstance(data, list):
+            return self._describe_read(pd.DataFrame(data), 'json', encoding)
+        elif isinstance(data, dict):
+            # 嵌套字典转为多列
+            return self._describe_read(pd.json_normalize(data), 'json', encoding)
+        else:
+            raise ValueError("JSON格式不支持（需为列表或对象）")
+
+    @staticmethod
+    def load_document(file_path, encodings=None, strict=False):
+        """解析整个JSON文档并返回解析出的对象，编码不符时换下一个候选编码"""
+        encodings = encodings or ['utf-8', 'gbk', 'gb2312', 'ansi', 'utf-16']
+        for encoding in candidate_encodings(file_path, encodings):
             try:
-                with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+                # 严格解码，编码不符时换下一个候选编码
+                with open_text(file_path, encoding=encoding) as f:
                     # 非严格模式解析，容忍尾逗号等常见问题
                     data = json.load(f, strict=strict)
-                # 支持更多JSON结构（如嵌套字典）
-                if isinstance(data, list):
-                    return pd.DataFrame(data)
-                elif isinstance(data, dict):
-                    # 嵌套字典转为多列
-                    return pd.json_normalize(data)
-                else:
-                    raise ValueError("JSON格式不支持（需为列表或对象）")
             except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
+            remember_encoding(file_path, encoding)
+            return data
         raise ValueError(f"JSON文件读取失败，已尝试编码: {encodings}")
 
+    @staticmethod
+    def is_json_lines(file_path, encoding):
+        """判断是否为NDJSON（每行一个JSON对象）：首个非空行本身就是完整的JSON对象"""
+        with open_text(file_path, encoding=encoding, errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if not line.startswith('{'):
+                    return False
+                try:
+                    return isinstance(json.loads(line), dict)
+                except json.JSONDecodeError:
+                    return False
+        return False
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        # 只有NDJSON可以按行分块；普通JSON数组/对象需整体解析
+        if self.is_json_lines(file_path, detect_encoding(file_path, encodings)):
+            yield from self.lines_processor.iter_chunks(file_path, chunksize, encodings, **kwargs)
+        else:
+            yield from super().iter_chunks(file_path, chunksize, encodings, **kwargs)
+
+
+class NdjsonFileProcessor(FileProcessor):
+    """NDJSON/JSON Lines：每行一条记录，按批解析，嵌套字段展开为 a.b 形式的列
+
+    已安装pyarrow且文件为UTF-8时，整批原始字节交给Arrow多线程解析，首批推断出的字段类型
+    缓存为后续批次的显式schema（新字段仍自动推断）；其他编码或某批解析失败时，
+    逐行 json.loads 后用 json_normalize 展开，无法解析的行跳过。
+    """
+
+    BATCH_LINES = 100000  # read_file 每批解析的行数
+    ARROW_ENCODINGS = ('utf-8', 'utf-8-sig', 'ascii')
+
+    def __init__(self):
+        super().__init__()
+        # {文件路径: 已知字段的Arrow schema}
+        self.schemas = {}
+
+    def get_supported_extensions(self):
+        return ['.jsonl', '.ndjson']
+
+    def read_file(self, file_path, encodings=None, **kwargs):
+        try:
+            chunks = list(self.iter_chunks(file_path, self.BATCH_LINES, encodings, **kwargs))
+        except (OSError, ValueError) as e:
+            raise ValueError(f"NDJSON文件读取失败: {str(e)}")
+        encoding = detect_encoding(file_path, encodings)
+        engine = 'pyarrow' if self._use_arrow(encoding) else 'json'
+        if not chunks:
+            return self._describe_read(pd.DataFrame(), engine, encoding)
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        df.attrs.pop("bytes_read", None)
+        return self._describe_read(df, engine, encoding)
+
+    def _use_arrow(self, encoding):
+        return pa_json is not None and codecs.lookup(encoding).name in self.ARROW_ENCODINGS
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        encoding = confirm_encoding(file_path, encodings)
+        strict = kwargs.get('strict', False)
+        use_arrow = self._use_arrow(encoding)
+        if use_arrow:
+            batches = self._iter_byte_lines(file_path, chunksize)
+        else:
+            batches = self._iter_text_lines(file_path, chunksize, encoding)
+
+        self.schemas.pop(file_path, None)
+        # 已出现过的列（有序），保证各块列顺序一致
+        columns = {}
+        for lines, bytes_read in batches:
+            chunk = self._parse_arrow(file_path, lines) if use_arrow else None
+            if chunk is None:
+                if use_arrow:
+                    lines = [line.decode('utf-8', errors='replace') for line in lines]
+                chunk = self._parse_records(lines, strict)
+            columns.update(dict.fromkeys(chunk.columns))
+            if len(columns) != len(chunk.columns):
+                chunk = chunk.reindex(columns=list(columns))
+            chunk.attrs["bytes_read"] = bytes_read
+            yield chunk
+
+    @staticmethod
+    def _iter_byte_lines(file_path, chunksize):
+        """按行分块读取原始字节，产出 (行列表, 已读取字节数)"""
+        with open_binary(file_path) as f:
+            first = True
+            while True:
+                lines = list(itertools.islice(f, chunksize))
+                if not lines:
+                    break
+                if first and lines[0].startswith(codecs.BOM_UTF8):
+                    lines[0] = lines[0][len(codecs.BOM_UTF8):]
+                first = False
+                yield lines, source_position(f)
+
+    def _parse_arrow(self, file_path, lines):
+        """Arrow解析一批行，失败（类型冲突、非法行等）时返回None"""
+        data = b''.join(lines)
+        schema = self.schemas.get(file_path)
+        parse_options = pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior='infer') \
+            if schema is not None else None
+        # 按CPU数切分块以便多线程解析
+        read_options = pa_json.ReadOptions(block_size=max(1 << 20, len(data) // (os.cpu_count() or 1) + 1))
+        try:
+            table = pa_json.read_json(pa.BufferReader(data), read_options=read_options,
+                                      parse_options=parse_options)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return None
+
+        known = schema or pa.schema([])
+        new_fields = [self._cached_field(field) for field in table.schema if field.name not in known.names]
+        new_fields = [field for field in new_fields if field is not None]
+        if new_fields:
+            self.schemas[file_path] = pa.schema(list(known) + new_fields)
+            if any(field.name in table.schema.names and field != table.schema.field(field.name)
+                   for field in new_fields):
+                # Arrow把时间文本推断成了时间戳，按缓存的schema重新解析本批
+                return self._parse_arrow(file_path, lines)
+        return self._table_to_frame(table)
+
+    @classmethod
+    def _cached_field(cls, field):
+        """写入schema缓存的字段：时间戳保留原文本（与json_normalize结果一致）；
+        全为null的字段类型未定，不缓存，留待后续批次推断"""
+        if pa.types.is_null(field.type):
+            return None
+        if pa.types.is_timestamp(field.type):
+            return field.with_type(pa.string())
+        if pa.types.is_struct(field.type):
+            children = [cls._cached_field(child) for child in field.type]
+            children = [child for child in children if child is not None]
+            return field.with_type(pa.struct(children)) if children else None
+        return field
+
+    @staticmethod
+    def _table_to_frame(table):
+        while any(pa.types.is_struct(field.type) for field in table.schema):
+            table = table.flatten()
+        df = table.to_pandas()
+        # 列表字段与json_normalize一致，保持为Python列表
+        for field in table.schema:
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                df[field.name] = table.column(field.name).to_pylist()
+        return df
+
+    @staticmethod
+    def _parse_records(lines, strict):
+        records = []
+        skipped = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line, strict=strict)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            records.append(record if isinstance(record, dict) else {"value": record})
+        if skipped:
+            print(f"NDJSON跳过 {skipped} 行无法解析的记录")
+        return pd.json_normalize(records)
+
+
 class TxtFileProcessor(FileProcessor):
+    def __init__(self, structured=True, index_cache_bytes=None):
+        """
+        Args:
+            structured: 是否识别常见日志格式（syslog、combined、key=value、Windows事件导出），
+                        在 event 列之外追加时间、主机、级别、IP、状态等带类型的列
+            index_cache_bytes: 行索引磁盘缓存的总大小上限，默认 LineIndex.MAX_CACHE_BYTES
+        """
+        super().__init__()
+        self.structured = structured
+        self.index_cache_bytes = index_cache_bytes
+        # {文件路径: 识别出的日志格式}
+        self.detected_formats = {}
+
     def get_supported_extensions(self):
         return ['.txt', '.log']
 
+    def get_line_index(self, file_path, encodings=None):
+        """返回文件的行偏移索引（已持久化时直接内存映射加载）"""
+        if is_compressed(file_path):
+            raise ValueError("压缩文件不支持按行号随机读取")
+        encodings = encodings or ['utf-8', 'gbk', 'gb2312', 'ansi']
+        return self._line_index(file_path, detect_encoding(file_path, encodings))
+
+    def _line_index(self, file_path, encoding):
+        return LineIndex(file_path, encoding, max_cache_bytes=self.index_cache_bytes)
+
+    def read_lines(self, file_path, start=0, stop=None, encodings=None):
+        """按行号读取 [start, stop) 行，只解码这些行"""
+        return self.get_line_index(file_path, encodings).read_lines(start, stop)
+
     def read_file(self, file_path, encodings=None, **kwargs):
+        # 按探测出的编码严格解码，文件后部出现该编码无法解码的字节（如开头全为ASCII的GBK日志）时换下一个候选编码
         encodings = encodings or ['utf-8', 'gbk', 'gb2312', 'ansi']
-        delimiter = kwargs.get('delimiter', '\t')
-        for encoding in encodings:
-            try:
-                return pd.read_csv(
-                    file_path,
-                    encoding=encoding,
-                    sep=delimiter,
-                    engine='python',
-                    header=None,
-                    names=['event']
-                )
-            except Exception:
-                continue
-        raise ValueError(f"TXT/LOG文件读取失败，已尝试编码: {encodings}")
\ No newline at end of file
+        try:
+            for encoding in candidate_encodings(file_path, encodings):
+                try:
+                    df = self._read_events(file_path, encoding)
+                except UnicodeDecodeError:
+                    continue
+                remember_encoding(file_path, encoding)
+                return df
+        except (OSError, ValueError, EOFError) as e:
+            raise ValueError(f"TXT/LOG文件读取失败: {str(e)}")
+        raise ValueError(f"TXT/LOG文件读取失败，已尝试编码: {encodings}")
+
+    def _read_events(self, file_path, encoding):
+        # 每行一条事件：按行偏移索引整段解码，不经过CSV解析器（行内的制表符、引号原样保留）；
+        # 压缩文件无法建立索引，改为解压流整体解码
+        if is_compressed(file_path):
+            engine = 'stream'
+            lines, data_bytes = self._read_compressed_lines(file_path, encoding)
+            head = lines[:1]
+        else:
+            engine = 'line_index'
+            line_index = self._line_index(file_path, encoding)
+            lines, data_bytes = None, None
+            head = line_index.preview(1)
+        if self.structured and is_windows_event_header(''.join(head)):
+            self.detected_formats[file_path] = 'windows_event'
+            return self._describe_read(read_windows_event_csv(file_path, encoding), engine, encoding, data_bytes)
+        if lines is None:
+            lines = line_index.read_lines(errors='strict')
+
+        df = self._event_frame(lines)
+        if self.structured:
+            df, log_format = structure_events(df)
+            self.detected_formats[file_path] = log_format
+        return self._describe_read(df, engine, encoding, data_bytes)
+
+    @staticmethod
+    def _read_compressed_lines(file_path, encoding):
+        """解压读取全部行，分行规则与行偏移索引一致（只按\\n分行，去掉行尾\\r），
+        返回 (行列表, 解压后的字节数)；编码不符时抛出 UnicodeDecodeError"""
+        with open_text(file_path, encoding=encoding, newline='') as f:
+            text = f.read()
+            data_bytes = f.buffer.tell()
+        if text.endswith('\n'):
+            text = text[:-1]
+        lines = [line.rstrip('\r') for line in text.split('\n')] if text else []
+        return lines, data_bytes
+
+    @staticmethod
+    def _event_frame(lines):
+        df = pd.DataFrame({'event': lines})
+        # 与之前的 skip_blank_lines 行为一致，忽略空行
+        return df[df['event'] != ''].reset_index(drop=True)
+
+    def plan_ranges(self, file_path, parts, encodings=None):
+        if is_compressed(file_path):
+            return None
+        # 行偏移索引在此建立并持久化，工作进程直接内存映射加载
+        line_index = self.get_line_index(file_path, encodings)
+        if self.structured and is_windows_event_header(''.join(line_index.preview(1))):
+            return None
+        ranges = line_index.line_ranges(parts)
+        if len(ranges) < 2:
+            return None
+
+        # 日志格式与key=value字段名按文件开头统一确定，各段解析出相同的列
+        plan = {"encoding": line_index.encoding, "ranges": ranges, "log_format": None, "options": {}}
+        if self.structured:
+            plan["log_format"] = detect_format(line_index.preview(DETECT_SAMPLE_LINES * 2))
+            if plan["log_format"] == 'key_value':
+                head = [line for line in line_index.preview(KEY_VALUE_SAMPLE_LINES) if line]
+                plan["options"] = {"keys": key_value_keys(head)}
+        return plan
+
+    def read_range(self, file_path, part, plan, **kwargs):
+        # 严格解码：探测编码只覆盖文件开头，某段无法解码时由调用方改为整文件读取（含编码回退）
+        df = self._event_frame(self._line_index(file_path, plan["encoding"]).read_lines(*part, errors='strict'))
+        if plan["log_format"]:
+            df, _ = structure_events(df, plan["log_format"], **plan["options"])
+        return df
+
+    def combine_ranges(self, file_path, frames, plan):
+        self.detected_formats[file_path] = plan["log_format"]
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_chunks(self, file_path, chunksize, encodings=None, **kwargs):
+        # 每行一条事件，行内容原样保留
+        # 分块读取无法中途换编码，先确认整个文件可按该编码解码
+        encoding = confirm_encoding(file_path, encodings)
+        for lines, bytes_read in self._iter_text_lines(file_path, chunksize, encoding):
+            chunk = pd.DataFrame({'event': lines})
+            chunk.attrs["bytes_read"] = bytes_read
+            yield chunk
\ No newline at end of file
@@ -0,0 +1,300 @@
+import io
+import os
+import mmap
+import codecs
+import hashlib
+import threading
+import numpy as np
+from utils.helpers import get_cache_dir
+
+SCAN_BLOCK_SIZE = 64 * 1024 * 1024  # 统计引号时每次处理的字节数
+SEEK_BLOCK_SIZE = 1024 * 1024  # 从切分点向后寻找记录边界时每次处理的字节数
+
+_evict_lock = threading.Lock()
+
+
+class LineIndex:
+    """文本文件的行偏移索引：内存映射扫描换行符，记录每行起始字节偏移（uint64数组）
+
+    索引按 (路径, 编码) 持久化到 cache/line_index，每个文件只保留一份，文件头记录建立时的大小与修改时间，
+    再次打开未变化的文件时直接内存映射加载，文件变化（如日志仍在追加）后重建并覆盖原索引。
+    索引目录总大小超过上限时按最近使用时间淘汰。
+    有了索引，预览、按行号随机读取、按字节均分行范围都只需解码实际访问到的行。
+    """
+
+    BLOCK_SIZE = 64 * 1024 * 1024  # 扫描换行符时每次处理的字节数，限制临时数组大小
+    FORMAT = 2  # 索引文件格式版本：首两项为 (文件大小, 修改时间纳秒)，其后为行偏移
+    MAX_CACHE_BYTES = 512 * 1024 * 1024  # 索引目录总大小上限
+
+    def __init__(self, file_path, encoding='utf-8', cache_dir=None, max_cache_bytes=None):
+        """
+        Args:
+            file_path: 文本文件路径
+            encoding: 文件编码，UTF-16按双字节换行符建立索引
+            cache_dir: 索引持久化目录，默认 cache/line_index
+            max_cache_bytes: 索引目录总大小上限，默认 MAX_CACHE_BYTES
+        """
+        self.file_path = file_path
+        self.encoding = encoding
+        self.cache_dir = cache_dir or get_cache_dir('line_index')
+        self.max_cache_bytes = self.MAX_CACHE_BYTES if max_cache_bytes is None else max_cache_bytes
+        stat = os.stat(file_path)
+        self.file_size = stat.st_size
+        self._signature = (stat.st_size, stat.st_mtime_ns)
+        # offsets[i] 为第i行起始偏移，末位为文件结尾，共 行数+1 项
+        self.offsets = self._load_or_build()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _codec_info(self):
+        """返回 (换行符字节宽度, 字节序, 文本起始偏移)"""
+        name = codecs.lookup(self.encoding).name
+        if name not in ('utf-16', 'utf-16-le', 'utf-16-be'):
+            start = len(codecs.BOM_UTF8) if name == 'utf-8-sig' else 0
+            return 1, None, start
+
+        byteorder = '<' if name == 'utf-16-le' else '>' if name == 'utf-16-be' else None
+        start = 0
+        with open(self.file_path, 'rb') as f:
+            bom = f.read(2)
+        if name == 'utf-16':
+            start = 2 if bom in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE) else 0
+            byteorder = '>' if bom == codecs.BOM_UTF16_BE else '<'
+        return 2, byteorder, start
+
+    def _index_path(self):
+        identity = f"{self.FORMAT}|{os.path.abspath(self.file_path)}|{self.encoding}"
+        return os.path.join(self.cache_dir, hashlib.sha1(identity.encode('utf-8')).hexdigest() + '.npy')
+
+    def _load_or_build(self):
+        index_path = self._index_path()
+        if os.path.exists(index_path):
+            try:
+                data = np.load(index_path, mmap_mode='r')
+                if len(data) > 2 and (int(data[0]), int(data[1])) == self._signature:
+                    # 以修改时间记录最近使用，供LRU淘汰
+                    os.utime(index_path)
+                    return data[2:]
+            except (OSError, ValueError) as e:
+                print(f"加载行索引失败，将重新建立: {str(e)}")
+
+        offsets = self.build()
+        tmp_path = f"{index_path}.{threading.get_ident()}.tmp.npy"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(tmp_path, np.concatenate((np.array(self._signature, dtype=np.uint64), offsets)))
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            print(f"保存行索引失败: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return offsets
+        evict_index_cache(self.max_cache_bytes, self.cache_dir)
+        return offsets
+
+    def build(self):
+        """扫描文件建立行起始偏移数组"""
+        width, byteorder, start = self._codec_info()
+        if self.file_size <= start:
+            return np.array([self.file_size], dtype=np.uint64)
+
+        parts = [np.array([start], dtype=np.uint64)]
+        with open(self.file_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            block = self.BLOCK_SIZE - self.BLOCK_SIZE % width
+            for pos in range(start, self.file_size, block):
+                end = min(pos + block, self.file_size)
+                end -= (end - pos) % width
+                if width == 1:
+                    data = np.frombuffer(mm, dtype=np.uint8, count=end - pos, offset=pos)
+                    newlines = np.flatnonzero(data == 0x0A)
+                else:
+                    data = np.frombuffer(mm, dtype=np.dtype(f'{byteorder}u2'),
+                                         count=(end - pos) // 2, offset=pos)
+                    newlines = np.flatnonzero(data == 0x0A) * 2
+                # 下一行从换行符之后开始
+                parts.append(newlines.astype(np.uint64) + np.uint64(pos + width))
+                del data
+
+        offsets = np.concatenate(parts)
+        # 文件以换行结尾时最后一个起始偏移等于文件大小，不构成新行；否则补上文件结尾
+        if offsets[-1] != self.file_size:
+            offsets = np.append(offsets, np.uint64(self.file_size))
+        return offsets
+
+    def read_lines(self, start=0, stop=None, errors='replace'):
+        """读取第 [start, stop) 行，只解码这些行所在的字节；errors 为 'strict' 时编码不符抛出 UnicodeDecodeError"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(0, start)
+        if start >= stop:
+            return []
+
+        begin, end = int(self.offsets[start]), int(self.offsets[stop])
+        with open(self.file_path, 'rb') as f:
+            f.seek(begin)
+            data = f.read(end - begin)
+
+        text = data.decode(self._decode_codec(), errors=errors)
+        if text.endswith('\n'):
+            text = text[:-1]
+        return [line.rstrip('\r') for line in text.split('\n')]
+
+    def _decode_codec(self):
+        # 行范围不含BOM，带BOM的编码按对应的无BOM编码解码
+        width, byteorder, _ = self._codec_info()
+        if width == 2:
+            return 'utf-16-le' if byteorder == '<' else 'utf-16-be'
+        name = codecs.lookup(self.encoding).name
+        return 'utf-8' if name == 'utf-8-sig' else self.encoding
+
+    def preview(self, count=100):
+        """读取文件开头的若干行"""
+        return self.read_lines(0, count)
+
+    def line_ranges(self, parts):
+        """把所有行划分为字节量大致相等的 parts 个连续范围 [(起始行, 结束行)]，用于并行解析"""
+        total = len(self)
+        if total == 0:
+            return []
+        parts = max(1, min(parts, total))
+        begin = int(self.offsets[0])
+        targets = begin + (self.file_size - begin) * np.arange(1, parts) // parts
+        bounds = np.searchsorted(self.offsets[:-1], targets.astype(np.uint64))
+        bounds = np.unique(np.concatenate(([0], bounds, [total])))
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _index_entries(cache_dir=None):
+    """返回索引文件列表 [(路径, 大小, 最近使用时间)]"""
+    cache_dir = cache_dir or get_cache_dir('line_index')
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            # 跳过其他线程正在写入的临时文件
+            if entry.is_file() and entry.name.endswith('.npy') and '.tmp.' not in entry.name:
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def index_cache_size(cache_dir=None):
+    """行索引缓存占用的总字节数"""
+    return sum(size for _, size, _ in _index_entries(cache_dir))
+
+
+def evict_index_cache(max_bytes, cache_dir=None):
+    """总大小超过上限时，从最久未使用的索引开始删除（正被内存映射的索引在Windows上无法删除，跳过）"""
+    with _evict_lock:
+        entries = _index_entries(cache_dir)
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def clear_index_cache(cache_dir=None):
+    """删除全部行索引（正被内存映射的索引在Windows上无法删除，跳过）"""
+    for path, _, _ in _index_entries(cache_dir):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _count_byte(data, value, begin, end):
+    count = 0
+    for pos in range(begin, end, SCAN_BLOCK_SIZE):
+        count += int(np.count_nonzero(data[pos:min(pos + SCAN_BLOCK_SIZE, end)] == value))
+    return count
+
+
+def split_records(file_path, start, parts, quotechar='"'):
+    """把 [start, 文件结尾) 切分为字节量大致相等的约 parts 个范围 [(起始偏移, 结束偏移)]
+
+    边界落在记录开头：换行符之后，且从start起的引号个数为偶数（换行不在引号字段内）。
+    按RFC 4180的引号规则判断，字段中间出现的孤立引号会使判断失效。start须为记录开头。
+    只适用于换行符和引号为单字节、且不会出现在多字节字符中的编码（UTF-8、GBK等）。
+    """
+    size = os.path.getsize(file_path)
+    if size <= start:
+        return []
+
+    with open(file_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 数组视图须在关闭mmap前全部释放，扫描放在单独的函数中
+        bounds = _record_bounds(np.frombuffer(mm, dtype=np.uint8), start, parts, ord(quotechar))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _record_bounds(data, start, parts, quote):
+    size = len(data)
+    bounds = [start]
+    pos = start
+    for k in range(1, max(1, parts)):
+        target = start + (size - start) * k // parts
+        if target <= pos:
+            continue
+        # pos 为上一个记录边界，此前的引号已配对
+        parity = _count_byte(data, quote, pos, target) & 1
+        pos = _next_record(data, target, parity, quote)
+        if pos >= size:
+            break
+        bounds.append(pos)
+    bounds.append(size)
+    return bounds
+
+
+def _next_record(data, pos, parity, quote):
+    """从pos向后找第一个不在引号字段内的换行符，返回其后一个字节的偏移；parity为pos之前未配对引号的奇偶"""
+    size = len(data)
+    while pos < size:
+        block = data[pos:pos + SEEK_BLOCK_SIZE]
+        newlines = np.flatnonzero(block == 0x0A)
+        quotes = np.flatnonzero(block == quote)
+        # 每个换行符之前（本块内）的引号个数
+        before = np.searchsorted(quotes, newlines)
+        outside = np.flatnonzero(((before & 1) ^ parity) == 0)
+        if outside.size:
+            return pos + int(newlines[outside[0]]) + 1
+        parity ^= quotes.size & 1
+        pos += len(block)
+    return size
+
+
+def first_record_end(file_path, quotechar='"'):
+    """返回第一条记录（CSV表头）之后的字节偏移"""
+    if os.path.getsize(file_path) == 0:
+        return 0
+    with open(file_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _next_record(np.frombuffer(mm, dtype=np.uint8), 0, 0, ord(quotechar))
+
+
+class ByteRangeReader(io.RawIOBase):
+    """只读取文件中 [begin, end) 字节的文件对象，供解析器直接按段读取而不必先整段读入内存"""
+
+    def __init__(self, file_path, begin, end):
+        self._file = open(file_path, 'rb')
+        self._file.seek(begin)
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._end - self._file.tell())
+        if size <= 0:
+            return 0
+        return self._file.readinto(memoryview(buffer)[:size])
+
+    def close(self):
+        self._file.close()
+        super().close()
@@ -0,0 +1,235 @@
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+# 常见日志格式的行首正则（命名分组即输出列）。模式需同时兼容Python re与RE2，
+# 已安装pyarrow时整列交给RE2批量执行，否则使用pandas str.extract
+SYSLOG_PATTERN = re.compile(
+    r'^(?P<timestamp>[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}) (?P<host>\S+) '
+    r'(?P<program>[^:\[\s]+)(?:\[(?P<pid>\d+)\])?: '
+)
+COMBINED_PATTERN = re.compile(
+    r'^(?P<ip>\S+) \S+ (?P<user>\S+) \[(?P<timestamp>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)(?: (?P<protocol>[^"]*))?" (?P<status>\d{3}) (?P<bytes>\d+|-)'
+    r'(?: "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)")?'
+)
+KEY_VALUE_PATTERN = re.compile(r'([A-Za-z_][\w.-]*)=("[^"]*"|\S*)')
+LEVEL_PATTERN = re.compile(
+    r'(?i)\b(?P<level>emerg|emergency|alert|crit|critical|err|error|warn|warning|notice|info|information|debug)\b'
+)
+
+# 日志级别别名统一为小写标准名
+LEVEL_ALIASES = {
+    "emergency": "emerg", "critical": "crit", "err": "error",
+    "warn": "warning", "information": "info", "信息": "info",
+    "警告": "warning", "错误": "error", "关键": "crit", "详细": "debug"
+}
+
+# 防火墙key=value日志中的常见字段 -> 统一列名
+KEY_VALUE_COLUMNS = {
+    "srcip": "src_ip", "src": "src_ip", "src_ip": "src_ip",
+    "dstip": "dst_ip", "dst": "dst_ip", "dst_ip": "dst_ip",
+    "srcport": "src_port", "spt": "src_port", "src_port": "src_port",
+    "dstport": "dst_port", "dpt": "dst_port", "dst_port": "dst_port",
+    "devname": "host", "hostname": "host", "host": "host",
+    "action": "status", "level": "level", "proto": "protocol"
+}
+KEY_VALUE_SAMPLE_LINES = 1000  # key=value日志从前若干行收集字段名
+KEY_VALUE_MAX_KEYS = 64
+
+# Windows事件查看器导出的CSV表头（英文/中文），消息列没有表头
+WINDOWS_EVENT_HEADERS = [
+    ["Level", "Date and Time", "Source", "Event ID", "Task Category"],
+    ["级别", "日期和时间", "来源", "事件 ID", "任务类别"],
+]
+WINDOWS_EVENT_COLUMNS = ["level", "timestamp", "source", "event_id", "task_category", "message"]
+
+DETECT_SAMPLE_LINES = 50
+DETECT_MIN_RATIO = 0.8  # 样本中至少该比例的行匹配才判定为该格式
+
+
+def _to_arrow(events):
+    return pa.array(events.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+
+
+def _extract(events, pattern):
+    """整列正则提取命名分组，不匹配的行为空值，返回与events同索引的DataFrame。
+    RE2对未参与匹配的可选分组返回空字符串、str.extract返回空值，两种引擎统一把空捕获视为空值"""
+    if pc is None:
+        result = events.str.extract(pattern)
+    else:
+        extracted = pc.extract_regex(_to_arrow(events), pattern.pattern)
+        result = pd.DataFrame({
+            name: pc.struct_field(extracted, name).to_pandas()
+            for name in pattern.groupindex
+        }).set_axis(events.index)
+    return result.mask(result.eq(''))
+
+
+def _remove_prefix(events, pattern):
+    """删除行首匹配部分，返回其余内容；不匹配的行为空值"""
+    if pc is None:
+        rest = events.str.replace(pattern, '', n=1, regex=True)
+        return rest.where(events.str.match(pattern))
+
+    array = _to_arrow(events)
+    rest = pc.replace_substring_regex(array, pattern.pattern, '', max_replacements=1)
+    matched = pc.match_substring_regex(array, pattern.pattern)
+    return pc.if_else(matched, rest, None).to_pandas().set_axis(events.index)
+
+
+def _normalize_level(series):
+    level = series.str.strip().str.lower()
+    return level.replace(LEVEL_ALIASES)
+
+
+def _to_int(series):
+    return pd.to_numeric(series, errors='coerce').astype('Int64')
+
+
+def _to_datetime(series, **kwargs):
+    """解析时间列，带时区偏移的时间统一换算为UTC：同一文件的偏移可能随夏令时变化，
+    分段并行解析时各段的结果也需为同一类型"""
+    try:
+        parsed = pd.to_datetime(series, errors='coerce', **kwargs)
+    except ValueError:
+        # 混有不同的时区偏移
+        return pd.to_datetime(series, errors='coerce', utc=True, **kwargs)
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert('UTC')
+    return parsed
+
+
+def is_windows_event_header(line):
+    """判断首行是否为Windows事件查看器导出的CSV表头"""
+    fields = [field.strip().strip('"').lstrip('\ufeff') for field in line.split(',')]
+    return any(fields[:len(header)] == header for header in WINDOWS_EVENT_HEADERS)
+
+
+def detect_format(lines):
+    """根据样本行判断日志格式，返回 'syslog'/'combined'/'key_value'/'windows_event' 或 None"""
+    sample = [line for line in lines if isinstance(line, str) and line.strip()][:DETECT_SAMPLE_LINES]
+    if not sample:
+        return None
+    if is_windows_event_header(sample[0]):
+        return 'windows_event'
+
+    threshold = len(sample) * DETECT_MIN_RATIO
+    if sum(1 for line in sample if COMBINED_PATTERN.match(line)) >= threshold:
+        return 'combined'
+    if sum(1 for line in sample if SYSLOG_PATTERN.match(line)) >= threshold:
+        return 'syslog'
+    if sum(1 for line in sample if len(KEY_VALUE_PATTERN.findall(line)) >= 3) >= threshold:
+        return 'key_value'
+    return None
+
+
+def parse_syslog(events):
+    fields = _extract(events, SYSLOG_PATTERN)
+    fields['message'] = _remove_prefix(events, SYSLOG_PATTERN)
+    # 传统syslog时间不含年份，按当前年份解析
+    year = str(datetime.now().year)
+    fields['timestamp'] = pd.to_datetime(year + ' ' + fields['timestamp'],
+                                         format='%Y %b %d %H:%M:%S', errors='coerce')
+    fields['pid'] = _to_int(fields['pid'])
+    fields['level'] = _normalize_level(_extract(fields['message'], LEVEL_PATTERN)['level'])
+    return fields
+
+
+def parse_combined(events):
+    fields = _extract(events, COMBINED_PATTERN)
+    fields['timestamp'] = _to_datetime(fields['timestamp'], format='%d/%b/%Y:%H:%M:%S %z')
+    fields['status'] = _to_int(fields['status'])
+    fields['bytes'] = _to_int(fields['bytes'].replace('-', '0'))
+    # 按HTTP状态码划分级别，与其他文本列同为字符串类型
+    status = fields['status'].fillna(0).to_numpy()
+    level = np.select([status >= 500, status >= 400, status > 0], ['error', 'warning', 'info'], default=None)
+    fields['level'] = pd.Series(level, index=fields.index, dtype=events.dtype)
+    return fields
+
+
+def key_value_keys(lines):
+    """从样本行收集key=value字段名（按出现顺序）"""
+    keys = []
+    for line in lines[:KEY_VALUE_SAMPLE_LINES]:
+        if not isinstance(line, str):
+            continue
+        for key, _ in KEY_VALUE_PATTERN.findall(line):
+            if key not in keys:
+                keys.append(key)
+    return keys[:KEY_VALUE_MAX_KEYS]
+
+
+def parse_key_value(events, keys=None):
+    # 字段名默认取自前若干行（分段解析时由调用方统一给出），每个字段整列提取一次
+    if keys is None:
+        keys = key_value_keys(events.head(KEY_VALUE_SAMPLE_LINES).tolist())
+
+    fields = pd.DataFrame(index=events.index)
+    for key in keys:
+        pattern = re.compile(rf'(?:^|\s){re.escape(key)}=(?P<value>"[^"]*"|\S*)')
+        fields[key] = _extract(events, pattern)['value'].str.strip('"')
+
+    # 常见字段统一命名，其余键原样保留为列
+    renamed = {}
+    for key in fields.columns:
+        column = KEY_VALUE_COLUMNS.get(key.lower())
+        if column and column not in renamed.values() and column not in fields.columns:
+            renamed[key] = column
+    fields = fields.rename(columns=renamed)
+
+    if 'date' in fields.columns and 'time' in fields.columns:
+        fields['timestamp'] = _to_datetime(fields['date'] + ' ' + fields['time'])
+    for column in ('src_port', 'dst_port'):
+        if column in fields.columns:
+            fields[column] = _to_int(fields[column])
+    if 'level' in fields.columns:
+        fields['level'] = _normalize_level(fields['level'])
+    return fields
+
+
+def read_windows_event_csv(file_path, encoding):
+    """读取Windows事件查看器导出的CSV：表头只有5列而数据行带消息列，按固定列名解析"""
+    frame = pd.read_csv(file_path, encoding=encoding, encoding_errors='replace', header=None,
+                        skiprows=1, names=WINDOWS_EVENT_COLUMNS, engine='c', skip_blank_lines=True,
+                        dtype={"task_category": object})
+    # 导出时间的格式随系统区域设置变化，逐个推断
+    frame['timestamp'] = _to_datetime(frame['timestamp'], format='mixed')
+    frame['event_id'] = _to_int(frame['event_id'])
+    frame['level'] = _normalize_level(frame['level'].astype(str))
+    return frame
+
+
+LINE_PARSERS = {
+    "syslog": parse_syslog,
+    "combined": parse_combined,
+    "key_value": parse_key_value,
+}
+
+
+def structure_events(df, log_format=None, **options):
+    """在保留原始 event 列的同时，为识别出格式的日志追加结构化列
+
+    Args:
+        df: 含 event 列的DataFrame
+        log_format: 指定格式，默认按样本自动识别
+        options: 传给格式解析函数的参数（如key_value的keys）
+    Returns:
+        tuple: (DataFrame, 格式名或None)
+    """
+    events = df['event']
+    log_format = log_format or detect_format(events.head(DETECT_SAMPLE_LINES * 2).tolist())
+    parser = LINE_PARSERS.get(log_format)
+    if parser is None:
+        return df, None
+
+    fields = parser(events, **options)
+    fields = fields.drop(columns=[c for c in fields.columns if c == 'event'])
+    return pd.concat([df, fields], axis=1), log_format
@@ -0,0 +1,169 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.helpers import split_extension
+from core.anonymize_pipeline import AnonymizePipeline
+from core.column_anonymizer import ColumnAnonymizer
+
+# 工作进程内的去敏引擎，由 _init_worker 在进程启动时根据词典快照构建一次
+_worker_anonymizer = None
+_worker_snapshot = None
+
+
+def _init_worker(snapshot):
+    """工作进程初始化：接收已编译的不可变词典快照"""
+    global _worker_anonymizer, _worker_snapshot
+    _worker_snapshot = snapshot
+    _worker_anonymizer = ColumnAnonymizer(lambda text: snapshot.replace(text)[0])
+
+
+def _flush_worker():
+    """任务结束时把本进程缓冲的假名写入反查索引"""
+    if _worker_snapshot.detector:
+        _worker_snapshot.detector.flush()
+
+
+def _anonymize_chunk_task(chunk, ext=None):
+    """工作进程任务：对DataFrame块、NDJSON行或文本行列表去敏"""
+    if isinstance(chunk, pd.DataFrame):
+        anonymized_df, _ = _worker_anonymizer.anonymize_dataframe(chunk)
+        _flush_worker()
+        return anonymized_df
+    if ext in AnonymizePipeline.JSON_LINES_EXTENSIONS:
+        lines = AnonymizePipeline.anonymize_records(_worker_anonymizer, chunk)
+        _flush_worker()
+        return lines
+
+    anonymized, _ = _worker_anonymizer.anonymize_series(pd.Series(chunk, dtype=object))
+    _flush_worker()
+    return anonymized.tolist()
+
+
+def _anonymize_file_task(file_processor, full_path, output_path, ext, encodings):
+    """工作进程任务：整文件读取、去敏并保存（用于Excel/JSON等非流式格式）"""
+    if ext == '.json' or ext in AnonymizePipeline.JSON_LINES_EXTENSIONS:
+        AnonymizePipeline.anonymize_json_file(_worker_anonymizer, full_path, output_path, encodings,
+                                              AnonymizePipeline.DEFAULT_CHUNK_SIZE)
+        _flush_worker()
+        return output_path
+    df = file_processor.load(full_path, encodings=encodings)
+    anonymized_df, _ = _worker_anonymizer.anonymize_dataframe(df)
+    _flush_worker()
+    AnonymizePipeline.save_dataframe(anonymized_df, output_path, ext)
+    return output_path
+
+
+class ParallelAnonymizePipeline(AnonymizePipeline):
+    """多进程并行去敏：整文件与大文件的数据块分发到进程池，按提交顺序写回以保证文件内顺序"""
+
+    def __init__(self, processor, workers=None, **kwargs):
+        """
+        Args:
+            workers: 工作进程数，默认读取配置 anonymize_workers（0表示CPU核数）
+        """
+        super().__init__(processor, **kwargs)
+        workers = workers if workers is not None else processor.config.get("anonymize_workers", 1)
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        # 在途数据块上限，限制父进程中缓存的块数量从而约束内存
+        self.max_pending = self.workers * 2
+
+    def run(self, file_names, output_dir):
+        jobs = self.prepare_jobs(file_names, output_dir)
+        # 每个工作进程在启动时获得一份已编译的词典快照，无需各自重建自动机
+        snapshot = self.snapshot.compile()
+
+        results = {}
+        pending = deque()
+        # 由界面的QThread发起，fork会复制其他线程持有的锁，改用spawn启动干净的工作进程
+        pool = ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker,
+                                   initargs=(snapshot,))
+        try:
+            for safe_file, full_path, output_path in jobs:
+                self._report(0, safe_file)
+                self._submit_file(pool, pending, safe_file, full_path, output_path)
+                results[safe_file] = output_path
+            self._drain(pending, 0)
+        except Exception:
+            for task in pending:
+                if task["writer"] is not None:
+                    task["writer"]["out"].close()
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+        return results
+
+    def _submit_file(self, pool, pending, file_name, full_path, output_path):
+        """将单个文件拆分为任务提交到进程池"""
+        ext, _ = split_extension(file_name)
+        file_size = os.path.getsize(full_path)
+
+        if not (self.streaming and ext in self.STREAM_EXTENSIONS):
+            processor = self.processor.extension_map.get(ext)
+            if processor is None:
+                raise RuntimeError(f"去敏文件 {file_name} 失败: 不支持的文件格式 {ext}")
+            future = pool.submit(_anonymize_file_task, processor, full_path, output_path,
+                                 ext, self.processor.supported_encodings)
+            pending.append({"future": future, "writer": None, "file": file_name,
+                            "bytes": file_size, "last": True})
+            self._drain(pending, self.max_pending)
+            return
+
+        writer = {"out": self.open_output(output_path, ext), "ext": ext, "first": True, "pos": 0}
+        try:
+            self._submit_chunks(pool, pending, writer, file_name, full_path, ext)
+        except pd.errors.ParserError:
+            if ext != '.csv':
+                raise
+            # C解析器无法处理：等待已提交的块完成后清空输出，改用python引擎重新提交
+            self._drain(pending, 0)
+            writer["out"].close()
+            self.done_bytes -= writer["pos"]
+            writer.update({"out": self.open_output(output_path, ext), "first": True, "pos": 0})
+            self._submit_chunks(pool, pending, writer, file_name, full_path, ext, engine='python')
+
+        # 文件结束标记：全部块写完后关闭输出并补齐进度
+        pending.append({"future": None, "writer": writer, "file": file_name,
+                        "bytes": file_size, "last": True})
+        self._drain(pending, self.max_pending)
+
+    def _submit_chunks(self, pool, pending, writer, file_name, full_path, ext, engine='c'):
+        if ext == '.csv':
+            chunks = self._iter_csv_chunks(full_path, engine=engine)
+        elif ext in self.JSON_LINES_EXTENSIONS:
+            chunks = self._iter_record_chunks(full_path)
+        else:
+            chunks = self._iter_text_chunks(full_path)
+
+        for chunk, bytes_read in chunks:
+            pending.append({"future": pool.submit(_anonymize_chunk_task, chunk, ext), "writer": writer,
+                            "file": file_name, "bytes": bytes_read, "last": False})
+            self._drain(pending, self.max_pending)
+
+    def _drain(self, pending, limit):
+        """按提交顺序取回结果并写出，直到在途任务数不超过limit"""
+        while len(pending) > limit:
+            task = pending.popleft()
+            writer = task["writer"]
+            try:
+                result = task["future"].result() if task["future"] is not None else None
+            except Exception as e:
+                if writer is not None:
+                    writer["out"].close()
+                raise RuntimeError(f"去敏文件 {task['file']} 失败: {str(e)}")
+
+            if writer is None:
+                # 整文件任务
+                self.done_bytes += task["bytes"]
+            elif task["last"]:
+                writer["out"].close()
+                self.done_bytes += task["bytes"] - writer["pos"]
+            else:
+                self.write_chunk(writer["out"], result, writer["ext"], writer["first"])
+                writer["first"] = False
+                self.done_bytes += task["bytes"] - writer["pos"]
+                writer["pos"] = task["bytes"]
+            self._report(0, task["file"])
@@ -0,0 +1,141 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def to_ipc_buffer(df):
+    """把DataFrame序列化为一块Arrow IPC流缓冲区；无法无损转为Arrow时返回None
+
+    列数据按列整块写入，跨进程传输时只需复制一块连续内存，不必逐个对象pickle。
+    含列表/字典单元格的DataFrame也返回None：经Arrow往返后这些单元格会变为numpy数组。
+    """
+    if pa is None or not all(isinstance(col, str) for col in df.columns):
+        # 非字符串列名经Arrow往返后会变成字符串
+        return None
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowException, TypeError, ValueError):
+        # 混合类型的object列等
+        return None
+    if any(pa.types.is_nested(field.type) for field in table.schema):
+        return None
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def from_ipc_buffer(buffer):
+    with pa.ipc.open_stream(buffer) as reader:
+        return reader.read_pandas()
+
+
+def _load_file_task(file_processor, full_path, encodings, dtype_optimizer, options):
+    """工作进程任务：解析文件并压缩列类型，返回 (Arrow IPC缓冲区或DataFrame, 读取统计, 类型压缩统计)"""
+    df = file_processor.load(full_path, encodings=encodings, **options)
+    dtype_stats = None
+    if dtype_optimizer is not None:
+        df, dtype_stats = dtype_optimizer.optimize(df)
+    read_stats = file_processor.read_stats.get(full_path)
+
+    buffer = to_ipc_buffer(df)
+    return (df if buffer is None else buffer), read_stats, dtype_stats
+
+
+def _read_range_task(file_processor, full_path, part, plan, options):
+    """工作进程任务：解析文件中的一段，返回Arrow IPC缓冲区或DataFrame"""
+    df = file_processor.read_range(full_path, part, plan, **options)
+    buffer = to_ipc_buffer(df)
+    return df if buffer is None else buffer
+
+
+class ProcessFileLoader:
+    """多进程加载文件：解析与类型压缩在工作进程中完成，绕开GIL；
+    结果以Arrow IPC缓冲区传回父进程后重建DataFrame，无法转为Arrow的结果退回pickle"""
+
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: 工作进程数，0或None表示CPU核数
+        """
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+
+    @staticmethod
+    def _create_pool(workers):
+        # 由界面的QThread发起，fork会复制其他线程持有的锁，改用spawn启动干净的工作进程
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def load(self, jobs, encodings, dtype_optimizer=None):
+        """按完成顺序产出加载结果
+
+        Args:
+            jobs: [(数据键, 完整路径, 文件处理器, read_file参数)]，如Excel的 {"sheet_name": 工作表}
+            encodings: 候选编码列表
+            dtype_optimizer: 列类型压缩器，None表示不压缩
+        Yields:
+            tuple: (数据键, 完整路径, 文件处理器, read_file参数, DataFrame, 读取统计, 类型压缩统计)
+        """
+        if not jobs:
+            return
+
+        pool = self._create_pool(min(self.workers, len(jobs)))
+        try:
+            futures = {
+                pool.submit(_load_file_task, file_processor, full_path, encodings, dtype_optimizer, options):
+                    (key, full_path, file_processor, options)
+                for key, full_path, file_processor, options in jobs
+            }
+            for future in as_completed(futures):
+                key, full_path, file_processor, options = futures[future]
+                try:
+                    payload, read_stats, dtype_stats = future.result()
+                except Exception as e:
+                    raise RuntimeError(f"读取文件 {key} 失败: {str(e)}")
+                df = payload if isinstance(payload, pd.DataFrame) else from_ipc_buffer(payload)
+                yield key, full_path, file_processor, options, df, read_stats, dtype_stats
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+    def load_ranges(self, file_processor, full_path, encodings):
+        """单个大文件按记录边界分段，由多个进程并行解析后按顺序合并
+
+        Returns:
+            pd.DataFrame: 合并结果；单进程、格式不支持分段或文件只能分为一段时返回None
+        """
+        if self.workers < 2:
+            return None
+        plan = file_processor.plan_ranges(full_path, self.workers, encodings)
+        if plan is None:
+            return None
+
+        pool = self._create_pool(min(self.workers, len(plan["ranges"])))
+        try:
+            frames = self._read_ranges(pool, file_processor, full_path, plan,
+                                       {i: {} for i in range(len(plan["ranges"]))})
+            # 各段独立推断列类型，不一致的段按统一类型重新解析
+            retry = file_processor.reconcile_ranges(frames, plan)
+            if retry:
+                for i, frame in zip(retry, self._read_ranges(pool, file_processor, full_path, plan, retry)):
+                    frames[i] = frame
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return file_processor.combine_ranges(full_path, frames, plan)
+
+    @staticmethod
+    def _read_ranges(pool, file_processor, full_path, plan, parts):
+        """提交 {段序号: 额外参数} 中的各段，按提交顺序返回DataFrame列表"""
+        futures = [pool.submit(_read_range_task, file_processor, full_path, plan["ranges"][i], plan, options)
+                   for i, options in parts.items()]
+        frames = []
+        for future in futures:
+            payload = future.result()
+            frames.append(payload if isinstance(payload, pd.DataFrame) else from_ipc_buffer(payload))
+        return frames
@@ -0,0 +1,158 @@
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+
+class ParseCache:
+    """解析结果磁盘缓存：把读取后的DataFrame以列式格式保存，文件未变化时直接加载
+
+    缓存键由 (绝对路径, 大小, 修改时间, 读取器及参数) 计算，文件一旦变化旧条目不再命中，
+    由容量上限按最近使用时间淘汰。已安装pyarrow时使用未压缩Feather（内存映射读取），
+    否则或列类型无法转为Arrow、含列表/字典单元格时使用pickle。
+    """
+
+    FORMAT = 1  # 缓存格式版本，结构变化时递增使旧条目失效
+
+    def __init__(self, cache_dir, max_bytes):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, file_path, reader, options):
+        stat = os.stat(file_path)
+        identity = [self.FORMAT, os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns,
+                    reader, options]
+        return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _entries(self):
+        """返回缓存文件列表 [(路径, 大小, 最近使用时间)]"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(('.feather', '.pkl')):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, file_path, reader, options=None):
+        """读取缓存，未命中或缓存损坏时返回None"""
+        try:
+            key = self._key(file_path, reader, options)
+        except OSError:
+            return None
+
+        for ext in ('.feather', '.pkl'):
+            path = os.path.join(self.cache_dir, key + ext)
+            if not os.path.exists(path):
+                continue
+            try:
+                if ext == '.feather':
+                    df = feather.read_table(path, memory_map=True).to_pandas()
+                else:
+                    with open(path, 'rb') as f:
+                        df = pickle.load(f)
+                # 以修改时间记录最近使用，供LRU淘汰
+                os.utime(path)
+                self.hits += 1
+                return df
+            except Exception as e:
+                print(f"读取解析缓存失败，将重新解析: {str(e)}")
+                self._remove(path)
+
+        self.misses += 1
+        return None
+
+    def put(self, file_path, reader, options, df):
+        """写入缓存（临时文件 + os.replace），之后按容量上限淘汰；单个条目超过上限时不缓存"""
+        try:
+            key = self._key(file_path, reader, options)
+        except OSError:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = None
+        if feather is not None:
+            path = os.path.join(self.cache_dir, key + '.feather')
+            try:
+                table = pa.Table.from_pandas(df)
+                if any(pa.types.is_nested(field.type) for field in table.schema):
+                    # 列表/字典单元格读回时会变为numpy数组，与直接解析的结果不同，改用pickle
+                    path = None
+                else:
+                    # 不压缩，读取时可直接内存映射
+                    self._write_atomic(path, lambda tmp: feather.write_feather(
+                        table, tmp, compression='uncompressed'))
+            except Exception:
+                # 混合类型列、非字符串列名等无法转为Arrow，改用pickle
+                path = None
+        if path is None:
+            path = os.path.join(self.cache_dir, key + '.pkl')
+            try:
+                self._write_atomic(path, lambda tmp: df.to_pickle(tmp, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                print(f"写入解析缓存失败: {str(e)}")
+                return
+        try:
+            oversized = os.path.getsize(path) > self.max_bytes
+        except OSError:
+            return
+        if oversized:
+            # 为它淘汰其余全部条目也放不下，保留原有缓存
+            self._remove(path)
+            return
+        self.evict()
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def size(self):
+        """当前缓存总字节数"""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._remove(path)
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
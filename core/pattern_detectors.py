@@ -0,0 +1,174 @@
+import re
+import hashlib
+import ipaddress
+import threading
+from collections import OrderedDict
+
+_HEX = r'[0-9A-Fa-f]'
+_OCTET = r'(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)'
+
+# 内置检测模式，顺序即合并正则中的优先级（同一位置先匹配者胜出）
+DETECTOR_PATTERNS = {
+    # 携带令牌/密钥参数的URL，整条URL视为敏感
+    "token_url": r"https?://[^\s\"'<>]*?[?&#](?:access_token|token|api_key|apikey|key|secret|"
+                 r"signature|sig|auth|password|passwd|pwd)=[^\s\"'<>&]+[^\s\"'<>]*",
+    "email": r"(?<![\w.+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+    "mac": rf"(?<![0-9A-Fa-f:-])(?:{_HEX}{{2}}[:-]){{5}}{_HEX}{{2}}(?![0-9A-Fa-f:-])",
+    # IPv6候选范围较宽，匹配后再用ipaddress校验
+    "ipv6": rf"(?<![0-9A-Fa-f:.])(?:{_HEX}{{0,4}}:){{2,7}}{_HEX}{{0,4}}(?![0-9A-Fa-f:])",
+    "ipv4": rf"(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?!\d|\.\d)",
+    "id_card": r"(?<!\d)[1-9]\d{5}(?:18|19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])\d{3}[\dXx](?!\d)",
+    "mobile": r"(?<![\d+])(?:\+?86[- ]?)?1[3-9]\d{9}(?!\d)",
+}
+
+# 身份证校验码（ISO 7064 MOD 11-2）
+_ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CHECK_CODES = "10X98765432"
+
+
+def _valid_ipv6(value):
+    # 至少三段非空，排除 "d::" 一类的代码片段与时间戳
+    if sum(1 for part in value.split(':') if part) < 3:
+        return False
+    try:
+        ipaddress.IPv6Address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _valid_id_card(value):
+    total = sum(int(d) * w for d, w in zip(value[:17], _ID_WEIGHTS))
+    return _ID_CHECK_CODES[total % 11] == value[17].upper()
+
+
+_VALIDATORS = {
+    "ipv6": _valid_ipv6,
+    "id_card": _valid_id_card,
+}
+
+
+class PatternDetector:
+    """内置敏感模式检测器：把IP、邮箱、手机号、身份证号、MAC、带令牌URL合并为一个正则，
+    单次扫描找出全部命中，并为每个值生成一致的假名，无需写入敏感词词典"""
+
+    TOKEN_PREFIX = "PROTECTED_"
+    DIGEST_LENGTH = 16
+    RECENT_LIMIT = 10000  # 内存中保留的最近假名数量，更早的假名通过反查索引还原
+
+    def __init__(self, kinds=None, pseudonymizer=None, index=None):
+        """
+        Args:
+            kinds: 启用的检测类型列表，默认启用全部 DETECTOR_PATTERNS
+            pseudonymizer: KeyedPseudonymizer，未提供时退化为无密钥哈希
+            index: 可选的PseudonymIndex，持久记录假名用于跨进程、跨运行还原
+        """
+        self.kinds = tuple(k for k in DETECTOR_PATTERNS if kinds is None or k in kinds)
+        self.pattern = re.compile('|'.join(
+            f'(?P<{kind}>{DETECTOR_PATTERNS[kind]})' for kind in self.kinds
+        )) if self.kinds else None
+        tags = '|'.join(self._tag(kind) for kind in self.kinds) or 'NONE'
+        self.token_pattern = re.compile(
+            rf'{self.TOKEN_PREFIX}(?:{tags})_[0-9a-f]{{{self.DIGEST_LENGTH}}}', re.IGNORECASE
+        )
+        self.pseudonymizer = pseudonymizer
+        self.index = index
+        # 最近生成的 假名(小写) -> 原值，容量有限，不随处理的数据量增长
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        # 各线程自己的新假名缓冲 [(线程, {假名: 原值})]，替换路径只写本线程缓冲、不加锁，
+        # 任务结束（flush）或还原前统一合并到 _recent
+        self._local = threading.local()
+        self._buffers = []
+
+    def __reduce__(self):
+        # 序列化（发送到工作进程或写入预编译快照）时只保留配置，不携带还原表
+        return PatternDetector, (self.kinds, self.pseudonymizer, self.index)
+
+    def __bool__(self):
+        return self.pattern is not None
+
+    @staticmethod
+    def _tag(kind):
+        return kind.replace('_', '').upper()
+
+    def pseudonym(self, kind, value):
+        """同一类型的同一个值总是得到同一个假名"""
+        if self.pseudonymizer is not None:
+            digest = self.pseudonymizer.digest(kind, value)
+        else:
+            digest = hashlib.sha256(f"{kind}:{value}".encode('utf-8')).hexdigest()[:self.DIGEST_LENGTH]
+        token = f"{self.TOKEN_PREFIX}{self._tag(kind)}_{digest}"
+        self._remember(token.lower(), value)
+        return token
+
+    def _remember(self, key, value):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = {}
+            with self._lock:
+                self._buffers.append((threading.current_thread(), pending))
+        pending[key] = value
+        # 长时间不flush时缓冲也不超过 _recent 的容量
+        if len(pending) > self.RECENT_LIMIT:
+            self._merge_pending()
+
+    def _merge_pending(self):
+        """把各线程缓冲的新假名合并到 _recent 并交给反查索引"""
+        merged = {}
+        with self._lock:
+            for thread, pending in self._buffers:
+                # popitem 逐项取出，其他线程同时写入的假名留到下次合并
+                while pending:
+                    try:
+                        key, value = pending.popitem()
+                    except KeyError:
+                        break
+                    merged[key] = value
+            # 已结束线程的缓冲已取空，不再保留
+            self._buffers = [item for item in self._buffers if item[0].is_alive()]
+            for key, value in merged.items():
+                if key in self._recent:
+                    self._recent.move_to_end(key)
+                else:
+                    self._recent[key] = value
+            while len(self._recent) > self.RECENT_LIMIT:
+                self._recent.popitem(last=False)
+        if self.index is not None and merged:
+            self.index.add_many(merged)
+
+    def flush(self):
+        """合并各线程缓冲的假名，并写入反查索引"""
+        self._merge_pending()
+        if self.index is not None:
+            self.index.flush()
+
+    def find_matches(self, text):
+        """返回 [(起始, 结束, 原值, 假名)]"""
+        if self.pattern is None:
+            return []
+
+        matches = []
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            value = match.group()
+            validator = _VALIDATORS.get(kind)
+            if validator and not validator(value):
+                continue
+            matches.append((match.start(), match.end(), value, self.pseudonym(kind, value)))
+        return matches
+
+    def restore(self, text):
+        """把假名还原为原值：先查最近生成的假名，再批量查反查索引，未知假名保持不变"""
+        keys = {m.lower() for m in self.token_pattern.findall(text)}
+        if not keys:
+            return text
+
+        self._merge_pending()
+        with self._lock:
+            found = {key: self._recent[key] for key in keys if key in self._recent}
+        if self.index is not None and len(found) < len(keys):
+            found.update(self.index.lookup(keys - found.keys()))
+        if not found:
+            return text
+        return self.token_pattern.sub(lambda m: found.get(m.group().lower(), m.group()), text)
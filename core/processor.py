@@ -1,11 +1,20 @@
 import os
+import time
 import pandas as pd
 import json
-from utils.helpers import get_file_list, sanitize_filename
+from utils.helpers import get_file_list, sanitize_filename, get_cache_dir, split_extension
 from core.api_client import DeepSeekAPI
+from core.column_anonymizer import ColumnAnonymizer
+from core.anonymize_pipeline import AnonymizePipeline
+from core.parallel_anonymizer import ParallelAnonymizePipeline
+from core.parse_cache import ParseCache
+from core.dataframe_cache import DataFrameCache
+from core.dtype_optimizer import DtypeOptimizer
+from core.parallel_loader import ProcessFileLoader
+from core.compression import is_compressed
 from core.file_processors import (
     CsvFileProcessor, ExcelFileProcessor,
-    JsonFileProcessor, TxtFileProcessor
+    JsonFileProcessor, NdjsonFileProcessor, TxtFileProcessor
 )
 
 
@@ -32,16 +41,37 @@ class LogAIProcessor:
         self.client = DeepSeekAPI(api_key=self.api_key,
                                   sensitive_processor=self.sensitive_processor) if self.api_key else None
 
-        # 存储当前选择的文件和数据
+        # 存储当前选择的文件
         self.current_files = None
-        self.current_data = None
+        # 已加载文件的内存缓存（按文件LRU，受内存预算限制，文件变化后失效）
+        self.data_cache = DataFrameCache(int(config.get("memory_cache_mb", 1024)) * 1024 * 1024)
+
+        # 列式去敏引擎：只对每列的唯一值去敏
+        self.column_anonymizer = ColumnAnonymizer(self._anonymize_text)
+        self.last_anonymize_stats = {}  # 最近一次去敏的分列统计（行/秒、唯一值比例）
+
+        # 解析结果磁盘缓存：文件未变化时跳过重新解析
+        self.parse_cache = ParseCache(
+            get_cache_dir('parsed'),
+            int(config.get("parse_cache_mb", 2048)) * 1024 * 1024
+        ) if config.get("parse_cache", True) else None
+
+        # 加载后的列类型压缩（默认关闭）：低基数文本转分类、浮点无损降位、时间文本解析为日期类型
+        self.dtype_optimizer = DtypeOptimizer(
+            category_max_ratio=config.get("category_max_ratio"),
+            downcast_integers=config.get("downcast_integers", False)
+        ) if config.get("optimize_dtypes", False) else None
+        self.dtype_stats = {}  # {文件名: 类型压缩前后的内存占用}
 
         # 初始化文件处理器（核心扩展点：添加新类型只需在这里注册）
         self.file_processors = [
-            CsvFileProcessor(),
+            CsvFileProcessor(engine=config.get("csv_engine", "auto"),
+                             structured=config.get("parse_log_formats", True)),
             ExcelFileProcessor(),
             JsonFileProcessor(),
-            TxtFileProcessor()
+            NdjsonFileProcessor(),
+            TxtFileProcessor(structured=config.get("parse_log_formats", True),
+                             index_cache_bytes=int(config.get("line_index_cache_mb", 512)) * 1024 * 1024)
         ]
 
         # 构建扩展名到处理器的映射
@@ -81,109 +111,258 @@ class LogAIProcessor:
 
         return self._load_file_data(file_names)
 
+    def get_file_processor(self, file_name):
+        """返回 (完整路径, 文件处理器)，文件不存在或格式不支持时抛出异常；
+        .gz/.bz2/.xz 压缩文件按内层扩展名选择处理器（如 app.log.gz 由TXT/LOG处理器读取）"""
+        safe_file = sanitize_filename(file_name)
+        full_path = os.path.join(self.current_data_dir, safe_file)
+
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"文件不存在: {full_path}")
+
+        ext, _ = split_extension(full_path)
+
+        if ext not in self.extension_map:
+            supported_exts = ", ".join(self.extension_map.keys())
+            raise ValueError(f"不支持的文件格式: {ext}。支持的格式: {supported_exts}")
+
+        return full_path, self.extension_map[ext]
+
     def _load_file_data(self, file_names):
-        """从当前数据目录读取文件数据，使用多线程加载"""
-        if self.current_data and set(file_names) == set(self.current_data.keys()):
-            return self.current_data
+        """从当前数据目录读取文件数据，已缓存且未变化的文件直接复用，其余默认多线程加载；
+        启用 load_in_processes、加载Excel的多个工作表或含需分段解析的大文件时由进程池并行解析
+
+        Excel文件名可写作 '文件名#工作表' 只加载指定工作表；配置 excel_sheets 为 all 时加载全部工作表，
+        每个工作表在结果中单独一项（键为 '文件名#工作表'）
+        """
+        units = self._expand_units(file_names)
+        sheets = any(options for *_, options in units)
+        # 分段解析只在进程池路径上进行：线程池的各线程分别创建进程池会使进程数成倍增加
+        large = any(not options and self._is_large_file(full_path) for _, full_path, _, options in units)
+        if large or (len(units) > 1 and (self.config.get("load_in_processes", False) or sheets)):
+            data_dict = self._load_in_processes(units)
+        else:
+            data_dict = self._load_in_threads(units)
+
+        if self.verbose:
+            stats = self.data_cache.stats()
+            print(f"内存缓存: 命中 {stats['hits']}, 未命中 {stats['misses']}, "
+                  f"{stats['files']} 个文件, {stats['bytes'] / 1024 / 1024:.1f} MB")
+        return data_dict
 
+    def _expand_units(self, file_names):
+        """把文件名展开为加载单元 [(数据键, 完整路径, 文件处理器, read_file参数)]"""
+        excel_sheets = self.config.get("excel_sheets", "first")
+        units = []
+        for file_name in file_names:
+            safe_file = sanitize_filename(file_name)
+            try:
+                base_file, sheet = safe_file, None
+                if '#' in safe_file and not os.path.exists(os.path.join(self.current_data_dir, safe_file)):
+                    base_file, sheet = safe_file.rsplit('#', 1)
+                full_path, processor = self.get_file_processor(base_file)
+                is_excel = isinstance(processor, ExcelFileProcessor)
+                if sheet is not None and not is_excel:
+                    raise ValueError("只有Excel文件可以指定工作表")
+
+                if sheet is not None:
+                    units.append((safe_file, full_path, processor, {"sheet_name": sheet}))
+                elif is_excel and excel_sheets == "all":
+                    names = processor.sheet_names(full_path)
+                    if len(names) > 1:
+                        units.extend((f"{safe_file}#{name}", full_path, processor, {"sheet_name": name})
+                                     for name in names)
+                    else:
+                        units.append((safe_file, full_path, processor, {}))
+                else:
+                    units.append((safe_file, full_path, processor, {}))
+            except Exception as e:
+                raise RuntimeError(f"读取文件 {file_name} 失败: {str(e)}")
+        return units
+
+    def _load_in_threads(self, units):
         data_dict = {}
         # 对于大量文件，使用线程池加速加载
         from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        def load_single_file(file_name):
-            safe_file = sanitize_filename(file_name)
-            full_path = os.path.join(self.current_data_dir, safe_file)
-
-            if not os.path.exists(full_path):
-                raise FileNotFoundError(f"文件不存在: {full_path}")
-
-            _, ext = os.path.splitext(full_path)
-            ext = ext.lower()
+        def load_unit(key, full_path, processor, options):
+            df = self.data_cache.get(full_path, key)
+            if df is not None:
+                return df
 
-            if ext not in self.extension_map:
-                supported_exts = ", ".join(self.extension_map.keys())
-                raise ValueError(f"不支持的文件格式: {ext}。支持的格式: {supported_exts}")
-
-            processor = self.extension_map[ext]
-            df = processor.read_file(full_path, encodings=self.supported_encodings)
-            return safe_file, df
+            df = self._read_with_parse_cache(key, full_path, processor, options)
+            self.data_cache.put(full_path, df, key)
+            return df
 
         # 使用线程池并行加载文件
-        with ThreadPoolExecutor(max_workers=min(4, len(file_names))) as executor:
-            futures = {executor.submit(load_single_file, fn): fn for fn in file_names}
+        with ThreadPoolExecutor(max_workers=min(4, len(units))) as executor:
+            futures = {executor.submit(load_unit, *unit): unit[0] for unit in units}
 
             for future in as_completed(futures):
                 try:
-                    safe_file, df = future.result()
-                    data_dict[safe_file] = df
+                    data_dict[futures[future]] = future.result()
                 except Exception as e:
                     raise RuntimeError(f"读取文件 {futures[future]} 失败: {str(e)}")
-
-        self.current_data = data_dict
         return data_dict
 
-    def process_and_anonymize_files(self, file_names, output_dir):
-        """处理并去敏文件"""
-        if not file_names:
-            raise ValueError("未选择文件")
-
-        if not output_dir or not os.path.exists(output_dir):
-            raise ValueError("无效的输出目录")
-
-        data_dict = self._load_file_data(file_names)
-        results = {}
+    def _load_in_processes(self, units):
+        """缓存命中的文件在本进程直接取用，其余分发到进程池解析，结果经Arrow IPC缓冲区传回"""
+        data_dict = {}
+        jobs = []
+        for key, full_path, processor, options in units:
+            df = self.data_cache.get(full_path, key)
+            if df is None and not options and self._is_large_file(full_path):
+                # 大文件不占用单个工作进程，而是逐个分段并行解析
+                try:
+                    df = self._read_with_parse_cache(key, full_path, processor, in_ranges=True)
+                except Exception as e:
+                    raise RuntimeError(f"读取文件 {key} 失败: {str(e)}")
+                self.data_cache.put(full_path, df, key)
+            elif df is None:
+                df = self._get_parsed(key, full_path, processor, options)
+                if df is not None:
+                    self.data_cache.put(full_path, df, key)
+            if df is None:
+                jobs.append((key, full_path, processor, options))
+            else:
+                data_dict[key] = df
+
+        loader = ProcessFileLoader(self.config.get("load_workers", 0))
+        results = loader.load(jobs, self.supported_encodings, self.dtype_optimizer)
+        for key, full_path, processor, options, df, read_stats, dtype_stats in results:
+            # 工作进程中的统计不会回写到本进程的处理器，在此补记
+            if read_stats is not None:
+                processor.store_read_stats(full_path, read_stats)
+            self._report_read(key, read_stats)
+            if dtype_stats is not None:
+                self._record_dtype_stats(key, dtype_stats)
+            self._put_parsed(full_path, processor, df, options)
+            self.data_cache.put(full_path, df, key)
+            data_dict[key] = df
+        return data_dict
 
-        for filename, df in data_dict.items():
-            # 对DataFrame中的文本进行去敏处理
-            anonymized_df = self._anonymize_dataframe(df)
-
-            # 保存去敏后的文件
-            base_name = os.path.splitext(filename)[0]
-            ext = os.path.splitext(filename)[1]
-            output_path = os.path.join(
-                output_dir,
-                f"{base_name}_anonymized{ext}"
-            )
-
-            # 根据文件类型保存
-            _, ext = os.path.splitext(filename)
-            if ext.lower() in ['.csv']:
-                anonymized_df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            elif ext.lower() in ['.xlsx', '.xls']:
-                anonymized_df.to_excel(output_path, index=False)
-            elif ext.lower() in ['.json']:
-                anonymized_df.to_json(output_path, orient='records', force_ascii=False)
-            else:  # 文本文件
-                content = "\n".join(anonymized_df.iloc[:, 0].astype(str).tolist())
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-
-            results[filename] = output_path
-
-        return results
-
-    def _anonymize_dataframe(self, df):
-        """对DataFrame进行去敏处理，使用向量化操作"""
-        df_copy = df.copy()
-
-        # 对每一列进行处理
-        for col in df_copy.columns:
-            # 处理字符串类型的列，使用向量化操作
-            if df_copy[col].dtype == 'object':
-                # 使用applymap代替apply提高性能
-                df_copy[col] = df_copy[col].astype(str).apply(
-                    lambda x: self._anonymize_text(x) if pd.notna(x) else x
-                )
+    def _parse_cache_key(self, processor, read_options=None):
+        # 读取器类型与参数不同时解析结果可能不同，一并作为缓存键
+        reader = type(processor).__name__
+        options = {
+            "encodings": self.supported_encodings,
+            "engine": getattr(processor, 'engine', None),
+            "structured": getattr(processor, 'structured', None),
+            "optimize_dtypes": self.dtype_optimizer is not None,
+            "downcast_integers": getattr(self.dtype_optimizer, 'downcast_integers', False),
+            "read_options": read_options or {}
+        }
+        return reader, options
+
+    def _get_parsed(self, safe_file, full_path, processor, read_options=None):
+        """从磁盘解析缓存读取，未命中返回None"""
+        if self.parse_cache is None:
+            return None
+        df = self.parse_cache.get(full_path, *self._parse_cache_key(processor, read_options))
+        if df is not None and self.verbose:
+            print(f"读取 {safe_file}: 命中解析缓存")
+        return df
+
+    def _put_parsed(self, full_path, processor, df, read_options=None):
+        if self.parse_cache is not None:
+            self.parse_cache.put(full_path, *self._parse_cache_key(processor, read_options), df)
+
+    def _read_with_parse_cache(self, safe_file, full_path, processor, read_options=None, in_ranges=False):
+        """读取单个文件（或Excel的单个工作表），优先使用磁盘解析缓存；in_ranges 为真时大文件分段并行解析"""
+        df = self._get_parsed(safe_file, full_path, processor, read_options)
+        if df is not None:
+            return df
+
+        df = self._read_in_ranges(safe_file, full_path, processor) if in_ranges and not read_options else None
+        if df is None:
+            df = processor.load(full_path, encodings=self.supported_encodings, **(read_options or {}))
+            self._report_read(safe_file, processor.read_stats.get(full_path))
+        if self.dtype_optimizer is not None:
+            df, stats = self.dtype_optimizer.optimize(df)
+            self._record_dtype_stats(safe_file, stats)
+        self._put_parsed(full_path, processor, df, read_options)
+        return df
+
+    def _is_large_file(self, full_path):
+        # 压缩文件无法按字节分段，整文件由单个进程解压解析
+        threshold = self.config.get("parallel_parse_mb", 256)
+        return (bool(threshold) and not is_compressed(full_path)
+                and os.path.getsize(full_path) >= threshold * 1024 * 1024)
+
+    def _read_in_ranges(self, safe_file, full_path, processor):
+        """大文件按记录边界分段，由进程池并行解析；文件较小、单核或格式不支持分段时返回None"""
+        if not self._is_large_file(full_path):
+            return None
+        start = time.perf_counter()
+        loader = ProcessFileLoader(self.config.get("load_workers", 0))
+        try:
+            df = loader.load_ranges(processor, full_path, self.supported_encodings)
+        except UnicodeDecodeError:
+            # 文件后部不符合按开头探测出的编码，整文件读取时会换用其他候选编码
+            return None
+        if df is not None and self.verbose:
+            seconds = time.perf_counter() - start
+            print(f"读取 {safe_file}: {loader.workers}进程分段解析, {len(df)}行, "
+                  f"{os.path.getsize(full_path) / 1048576 / seconds:.1f} MB/s")
+        return df
+
+    def _report_read(self, safe_file, stats):
+        if self.verbose and stats:
+            throughput = f"{stats['mb_per_sec']:.1f} MB/s"
+            if stats.get('data_bytes', stats['bytes']) != stats['bytes']:
+                # 压缩文件同时给出按压缩字节和解压后字节计算的吞吐量
+                throughput = f"压缩 {throughput}, 解压后 {stats['data_mb_per_sec']:.1f} MB/s"
+            print(f"读取 {safe_file}: {stats['engine']}解析器, {stats['rows']}行, {throughput}")
+
+    def _record_dtype_stats(self, safe_file, stats):
+        """记录类型压缩前后的内存占用"""
+        self.dtype_stats[safe_file] = stats
+        if self.verbose:
+            print(f"类型压缩 {safe_file}: {stats['before'] / 1024 / 1024:.1f} MB -> "
+                  f"{stats['after'] / 1024 / 1024:.1f} MB, 转换列: {stats['columns']}")
+
+    def process_and_anonymize_files(self, file_names, output_dir, progress_callback=None):
+        """处理并去敏文件，CSV/TXT/LOG按块流式处理，多核时分发到进程池并行去敏
+
+        Args:
+            progress_callback: 进度回调 (已处理字节, 总字节, 当前文件名)
+        Returns:
+            dict: {文件名: 输出路径}
+        """
+        workers = self.config.get("anonymize_workers", 1) or os.cpu_count() or 1
+        if workers > 1:
+            pipeline = ParallelAnonymizePipeline(self, workers=workers, progress_callback=progress_callback)
+        else:
+            pipeline = AnonymizePipeline(self, progress_callback=progress_callback)
+        return pipeline.run(file_names, output_dir)
+
+    def _anonymize_dataframe(self, df, snapshot=None):
+        """对DataFrame进行去敏处理，按列因子化后只处理唯一值
+
+        Args:
+            snapshot: 敏感词词典快照，默认使用当前快照
+        """
+        if snapshot is None:
+            column_anonymizer = self.column_anonymizer
+        else:
+            column_anonymizer = ColumnAnonymizer(lambda text: self._anonymize_text(text, snapshot))
+        df_copy, column_stats = column_anonymizer.anonymize_dataframe(df)
+        self.last_anonymize_stats = column_stats
+
+        if self.verbose:
+            for col, stats in column_stats.items():
+                print(f"去敏列 {col}: {stats['rows']} 行, 唯一值比例 {stats['unique_ratio']:.2%}, "
+                      f"{stats['rows_per_sec']:.0f} 行/秒")
 
         return df_copy
 
-    def _anonymize_text(self, text):
+    def _anonymize_text(self, text, snapshot=None):
         """对文本进行去敏处理"""
         if not text or not isinstance(text, str):
             return text
 
         # 使用敏感词处理器进行替换
-        anonymized_text, _ = self.sensitive_processor.replace_sensitive_words(text)
+        anonymized_text, _ = self.sensitive_processor.replace_sensitive_words(text, snapshot)
         return anonymized_text
 
     def generate_processing_code(self, user_request, file_names):
@@ -211,7 +390,7 @@ summary = f'共{len(result_table)}条记录
 
         prompt = f"""根据用户请求编写完整的Python处理代码:
 用户需求: {user_request}
-数据信息: {json.dumps(file_info, ensure_ascii=False)}
+数据信息: {json.dumps(file_info, ensure_ascii=False, default=str)}
 
 重要提示：
 1. 返回的内容只能是可直接执行的代码
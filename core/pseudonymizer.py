@@ -0,0 +1,156 @@
+import os
+import hmac
+import sqlite3
+import hashlib
+import secrets
+import threading
+
+
+class KeyedPseudonymizer:
+    """带密钥的确定性假名：假名 = HMAC-SHA256(密钥, 类型:原值) 截断
+
+    相同密钥下同一个值在任意文件、任意进程、任意次运行中都得到同一个假名，
+    无需保存任何映射；没有密钥则无法通过穷举原值反推假名
+    """
+
+    DIGEST_LENGTH = 16  # 十六进制位数（64位），上亿个不同值时碰撞概率仍可忽略
+
+    def __init__(self, key):
+        """
+        Args:
+            key: 十六进制密钥字符串
+        """
+        self.key = key
+        self._key_bytes = bytes.fromhex(key)
+
+    def __reduce__(self):
+        return KeyedPseudonymizer, (self.key,)
+
+    @staticmethod
+    def _is_valid_key(key):
+        try:
+            return bool(key) and len(bytes.fromhex(key)) > 0
+        except ValueError:
+            return False
+
+    @classmethod
+    def load_key(cls, config, key_file):
+        """读取假名密钥：配置中手动指定的 pseudonym_key 优先，否则读取密钥文件，首次使用时生成
+
+        生成的密钥只写入密钥文件（不纳入版本控制，权限0600），不经过 config.json：
+        密钥泄露后可以穷举IP、邮箱、手机号等原值反推假名
+        """
+        key = config.get("pseudonym_key", "") if config else ""
+        if key:
+            if cls._is_valid_key(key):
+                return key
+            print("配置中的假名密钥格式无效，改用密钥文件")
+
+        try:
+            with open(key_file, 'r', encoding='ascii') as f:
+                key = f.read().strip()
+            if cls._is_valid_key(key):
+                return key
+            print("假名密钥文件格式无效，已重新生成")
+        except FileNotFoundError:
+            pass
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"读取假名密钥文件失败，已重新生成: {str(e)}")
+
+        key = secrets.token_hex(32)
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(key)
+        except OSError as e:
+            print(f"保存假名密钥失败，本次运行的假名在重启后将无法复现: {str(e)}")
+        return key
+
+    def digest(self, kind, value):
+        message = f"{kind}:{value}".encode('utf-8')
+        return hmac.new(self._key_bytes, message, hashlib.sha256).hexdigest()[:self.DIGEST_LENGTH]
+
+
+class PseudonymIndex:
+    """可选的假名反查索引（SQLite），只用于还原，按需查询而不常驻内存"""
+
+    FLUSH_THRESHOLD = 1000  # 缓冲的新假名达到该数量时批量写入
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def __reduce__(self):
+        # 工作进程各自打开连接
+        return PseudonymIndex, (self.db_path,)
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # 去敏工作进程可能同时写入，WAL模式下读写互不阻塞
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pseudonyms (token TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID"
+            )
+        return self._conn
+
+    def add(self, token, value):
+        """记录假名，缓冲后批量写入"""
+        self.add_many({token: value})
+
+    def add_many(self, items):
+        """批量记录 {假名: 原值}"""
+        with self._lock:
+            self._pending.update(items)
+            if len(self._pending) < self.FLUSH_THRESHOLD:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.executemany("INSERT OR IGNORE INTO pseudonyms VALUES (?, ?)", pending.items())
+            except sqlite3.Error as e:
+                print(f"写入假名索引失败: {str(e)}")
+
+    def lookup(self, tokens):
+        """批量反查，返回 {假名: 原值}，未找到的假名不在结果中"""
+        tokens = list(tokens)
+        if not tokens:
+            return {}
+
+        self.flush()
+        result = {}
+        with self._lock:
+            try:
+                conn = self._connect()
+                # 分批查询，避免超出SQLite参数个数上限
+                for i in range(0, len(tokens), 500):
+                    batch = tokens[i:i + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = conn.execute(
+                        f"SELECT token, value FROM pseudonyms WHERE token IN ({placeholders})", batch
+                    )
+                    result.update(rows)
+            except sqlite3.Error as e:
+                print(f"查询假名索引失败: {str(e)}")
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._pending = {}
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM pseudonyms")
+            except sqlite3.Error as e:
+                print(f"清空假名索引失败: {str(e)}")
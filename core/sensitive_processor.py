@@ -3,40 +3,83 @@ import json
 import os
 import random
 import string
+import pickle
+import hashlib
+import threading
 import pandas as pd
 import uuid
 from datetime import datetime
-from utils.helpers import show_info_message, show_error_message
+from utils.helpers import show_info_message, show_error_message, get_cache_dir
+from core.word_matcher import MatcherSnapshot
+from core.pattern_detectors import PatternDetector
+from core.pseudonymizer import KeyedPseudonymizer, PseudonymIndex
+from core.word_store import JournalWordStore
+from core.encoding_detector import candidate_encodings
 
 
 class SensitiveWordProcessor:
+    # 批量导入的进度步骤：读取、校验去重、排序编译、保存
+    IMPORT_STEPS = 4
+    # 预编译快照格式版本，匹配器结构变化时递增以使旧快照失效
+    SNAPSHOT_FORMAT = 2
+
     def __init__(self, config):
         self.config = config
-        self.sensitive_words = {}  # 格式: {敏感词: 替换词}
-        self.replacement_map = {}  # 格式: {替换词: 敏感词} 用于还原
+        # 内置敏感模式检测（IP、邮箱、手机号等），与词典在同一次替换中生效，命中值不写入词典
+        # 假名由密钥哈希得出，无需保存映射；反查索引可选，用于还原较早生成的假名
+        self.pseudonym_index_file = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '../pseudonym_index.db'
+        )
+        self.pseudonym_key_file = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '../pseudonym.key'
+        )
+        self.detector = PatternDetector(
+            config.get("pattern_detectors") if config else None,
+            pseudonymizer=KeyedPseudonymizer(KeyedPseudonymizer.load_key(config, self.pseudonym_key_file)),
+            index=PseudonymIndex(self.pseudonym_index_file) if config and config.get("pseudonym_index") else None
+        )
+        # 当前发布的不可变词典快照（含 {敏感词: 替换词}、{替换词: 敏感词} 与匹配自动机）
+        # 变更时整体替换，读取方先取得快照引用再使用，无需加锁
+        self.snapshot = MatcherSnapshot(0, {}, detector=self.detector)
+        # 仅用于串行化写操作（增删改、导入、加载），替换与还原路径不加锁
+        self._write_lock = threading.Lock()
         self.sensitive_file = os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
             '../sensitive_words.json'
         )
         self.supported_encodings = ['utf-8', 'gbk', 'gb2312']
-
-        self.compiled_patterns = {}  # 存储预编译的正则表达式
-        self._compile_patterns()
+        # 快照 + 追加日志存储，单次变更只写增量
+        self.store = JournalWordStore(self.sensitive_file)
+        # 预编译匹配器快照，按词典内容哈希校验，避免每次启动重新排序和构建
+        self.compiled_snapshot_file = os.path.join(get_cache_dir(), 'sensitive_matcher.pkl')
 
         # 确保文件存在并加载敏感词
         self._ensure_file_exists()
         self.load_sensitive_words()
 
+    @property
+    def sensitive_words(self):
+        """当前快照的敏感词只读映射 {敏感词: 替换词}"""
+        return self.snapshot.sensitive_words
+
+    @property
+    def replacement_map(self):
+        """当前快照的还原只读映射 {替换词: 敏感词}"""
+        return self.snapshot.replacement_map
+
+    @property
+    def dict_version(self):
+        """词典版本号：每次增删改或加载后递增"""
+        return self.snapshot.version
+
     def _compile_patterns(self):
-        """预编译所有敏感词的正则表达式，提高替换效率"""
-        self.compiled_patterns.clear()
-        for word, replacement in self.sensitive_words.items():
-            try:
-                escaped_word = re.escape(word)
-                pattern = re.compile(f'{escaped_word}')
-                self.compiled_patterns[word] = (pattern, replacement)
-            except Exception as e:
-                print(f"编译敏感词'{word}'正则表达式出错: {str(e)}")
+        """立即为当前快照构建替换与还原自动机"""
+        try:
+            self.snapshot.compile()
+        except Exception as e:
+            print(f"构建敏感词匹配自动机出错: {str(e)}")
 
     def _ensure_file_exists(self):
         """确保敏感词文件存在，不存在则创建"""
@@ -53,101 +96,190 @@ class SensitiveWordProcessor:
         random_str = ''.join(random.choices(chars, k=8))
         return f"PROTECTED_{random_str}"
 
-    def _sort_sensitive_words(self):
+    def _generate_replacements(self, count):
+        """批量生成互不重复、且不与现有替换词冲突的随机替换词"""
+        existing = set(self.replacement_map)
+        replacements = []
+        seen = set()
+        while len(replacements) < count:
+            replacement = self._generate_replacement()
+            if replacement in existing or replacement in seen:
+                continue
+            seen.add(replacement)
+            replacements.append(replacement)
+        return replacements
+
+    def _sort_sensitive_words(self, words):
         """按敏感词长度降序排序，避免子串冲突"""
         sorted_words = sorted(
-            self.sensitive_words.items(),
+            words.items(),
             key=lambda x: len(x[0]),
             reverse=True
         )
-        self.sensitive_words = dict(sorted_words)
-        # 更新替换映射
-        self.replacement_map = {v: k for k, v in self.sensitive_words.items()}
+        return dict(sorted_words)
+
+    def _publish(self, words):
+        """排序后构建新的不可变快照，并以单次引用赋值原子发布"""
+        self.snapshot = MatcherSnapshot(self.snapshot.version + 1, self._sort_sensitive_words(words),
+                                        detector=self.detector)
+        return self.snapshot
 
     def load_sensitive_words(self):
-        """从文件加载敏感词"""
+        """从文件加载敏感词，词典未变化时直接使用预编译快照"""
         try:
-            with open(self.sensitive_file, 'r', encoding='utf-8') as f:
-                self.sensitive_words = json.load(f)
+            with self._write_lock:
+                dictionary_hash = self._dictionary_hash()
+                if self._load_compiled_snapshot(dictionary_hash):
+                    return True
+
+                # 读取快照并重放增量日志，排序后发布
+                self._publish(self.store.load())
+                self._compile_patterns()  # 加载后重新编译
+                # 日志尾部损坏时load会截断文件，因此重新计算哈希
+                self._save_compiled_snapshot(self._dictionary_hash())
+            return True
+        except Exception as e:
+            return False
 
-            # 去重并排序
-            self.sensitive_words = {k: v for k, v in self.sensitive_words.items()}
-            self._sort_sensitive_words()
-            self._compile_patterns()  # 加载后重新编译
+    def _dictionary_hash(self):
+        """计算词典文件（快照 + 增量日志）内容的哈希"""
+        digest = hashlib.sha256()
+        for path in (self.store.snapshot_path, self.store.journal_path):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _load_compiled_snapshot(self, dictionary_hash):
+        """哈希一致时从二进制快照恢复排序后的词典和两个匹配自动机"""
+        if not os.path.exists(self.compiled_snapshot_file):
+            return False
+        try:
+            with open(self.compiled_snapshot_file, 'rb') as f:
+                snapshot = pickle.load(f)
+            if (snapshot.get("format") != self.SNAPSHOT_FORMAT
+                    or snapshot.get("dictionary_hash") != dictionary_hash):
+                return False
+
+            self.store.journal_entries = snapshot["journal_entries"]
+            # 快照中不含检测器，按当前配置挂载
+            self.snapshot = snapshot["snapshot"].with_version(self.snapshot.version + 1, self.detector)
             return True
         except Exception as e:
+            print(f"加载敏感词预编译快照失败，将重新编译: {str(e)}")
             return False
 
+    def _save_compiled_snapshot(self, dictionary_hash):
+        """将编译结果原子地写入二进制快照"""
+        snapshot = {
+            "format": self.SNAPSHOT_FORMAT,
+            "dictionary_hash": dictionary_hash,
+            "journal_entries": self.store.journal_entries,
+            "snapshot": self.snapshot.without_detector()
+        }
+        tmp_path = self.compiled_snapshot_file + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.compiled_snapshot_file)
+        except Exception as e:
+            print(f"保存敏感词预编译快照失败: {str(e)}")
+
     def save_sensitive_words(self):
-        """保存敏感词到文件"""
+        """原子地保存完整敏感词快照到文件，并清空增量日志"""
         try:
-            with open(self.sensitive_file, 'w', encoding='utf-8') as f:
-                json.dump(self.sensitive_words, f, ensure_ascii=False, indent=2)
+            self.store.compact(dict(self.sensitive_words))
             return True
         except Exception as e:
+            print(f"保存敏感词失败: {str(e)}")
             return False
 
+    def _persist(self, ops):
+        """以单个事务追加写入本次变更，日志过长时压缩为快照"""
+        try:
+            self.store.append(ops)
+        except Exception as e:
+            print(f"写入敏感词日志失败: {str(e)}")
+            return self.save_sensitive_words()
+
+        if self.store.needs_compaction():
+            return self.save_sensitive_words()
+        return True
+
     def add_sensitive_word(self, word, replacement=None):
         """添加敏感词，自动去重和排序"""
         if not word or not isinstance(word, str) or word.strip() == "":
             return False, "敏感词不能为空"
 
         word = word.strip()
-        if word in self.sensitive_words:
-            return False, "敏感词已存在"
+        with self._write_lock:
+            if word in self.sensitive_words:
+                return False, "敏感词已存在"
 
-        # 生成替换词（如果未提供）
-        if not replacement or replacement.strip() == "":
-            replacement = self._generate_replacement()
-        else:
-            replacement = replacement.strip()
+            # 生成替换词（如果未提供）
+            if not replacement or replacement.strip() == "":
+                replacement = self._generate_replacement()
+            else:
+                replacement = replacement.strip()
 
-        self.sensitive_words[word] = replacement
-        self._sort_sensitive_words()
-        self.save_sensitive_words()
+            # 写时复制：在副本上修改后发布新快照
+            words = dict(self.sensitive_words)
+            words[word] = replacement
+            self._publish(words)
+            self._persist([("set", word, replacement)])
         return True, "添加成功"
 
     def remove_sensitive_word(self, word):
         """删除敏感词"""
-        if word in self.sensitive_words:
-            del self.sensitive_words[word]
-            self._sort_sensitive_words()
-            self.save_sensitive_words()
-            return True, "删除成功"
+        with self._write_lock:
+            if word in self.sensitive_words:
+                words = dict(self.sensitive_words)
+                del words[word]
+                self._publish(words)
+                self._persist([("del", word)])
+                return True, "删除成功"
         return False, "敏感词不存在"
 
     def update_sensitive_word(self, old_word, new_word, new_replacement=None):
         """更新敏感词"""
-        if old_word not in self.sensitive_words:
-            return False, "敏感词不存在"
-
         if not new_word or not isinstance(new_word, str) or new_word.strip() == "":
             return False, "新敏感词不能为空"
 
         new_word = new_word.strip()
-        # 如果新敏感词与其他现有敏感词冲突
-        if new_word != old_word and new_word in self.sensitive_words:
-            return False, "新敏感词已存在"
-
-        # 处理替换词
-        if new_replacement is None:
-            # 保持原替换词
-            new_replacement = self.sensitive_words[old_word]
-        elif new_replacement.strip() == "":
-            # 生成新的替换词
-            new_replacement = self._generate_replacement()
-        else:
-            new_replacement = new_replacement.strip()
-
-        # 删除旧的，添加新的
-        del self.sensitive_words[old_word]
-        self.sensitive_words[new_word] = new_replacement
-        self._sort_sensitive_words()
-        self.save_sensitive_words()
+        with self._write_lock:
+            if old_word not in self.sensitive_words:
+                return False, "敏感词不存在"
+
+            # 如果新敏感词与其他现有敏感词冲突
+            if new_word != old_word and new_word in self.sensitive_words:
+                return False, "新敏感词已存在"
+
+            # 处理替换词
+            if new_replacement is None:
+                # 保持原替换词
+                new_replacement = self.sensitive_words[old_word]
+            elif new_replacement.strip() == "":
+                # 生成新的替换词
+                new_replacement = self._generate_replacement()
+            else:
+                new_replacement = new_replacement.strip()
+
+            # 删除旧的，添加新的
+            words = dict(self.sensitive_words)
+            del words[old_word]
+            words[new_word] = new_replacement
+            self._publish(words)
+            self._persist([("del", old_word), ("set", new_word, new_replacement)])
         return True, "更新成功"
 
-    def import_from_file(self, file_path):
-        """从CSV/Excel导入敏感词"""
+    def import_from_file(self, file_path, progress_callback=None):
+        """从CSV/Excel导入敏感词
+
+        Args:
+            progress_callback: 进度回调 (当前步骤, 总步骤数, 提示文本)
+        """
         if not os.path.exists(file_path):
             return False, "文件不存在"
 
@@ -156,9 +288,12 @@ class SensitiveWordProcessor:
         ext = ext.lower()
 
         try:
+            if progress_callback:
+                progress_callback(0, self.IMPORT_STEPS, "正在读取文件...")
+
             # 尝试不同编码
             df = None
-            for encoding in self.supported_encodings:
+            for encoding in candidate_encodings(file_path, self.supported_encodings):
                 try:
                     if ext in ['.csv']:
                         df = pd.read_csv(file_path, encoding=encoding)
@@ -171,32 +306,64 @@ class SensitiveWordProcessor:
             if df is None:
                 return False, f"无法读取文件，已尝试编码: {self.supported_encodings}"
 
-            # 检查是否包含"敏感词"列
-            if "敏感词" not in df.columns:
-                return False, "文件必须包含'敏感词'列"
+            return self.import_dataframe(df, progress_callback)
+        except Exception as e:
+            return False, f"导入失败: {str(e)}"
 
-            # 处理空值
-            df = df.fillna("")
+    def import_dataframe(self, df, progress_callback=None):
+        """批量导入敏感词：向量化校验去重后，只排序、编译、保存各一次
 
-            count = 0
-            for _, row in df.iterrows():
-                word = str(row["敏感词"]).strip()
-                replacement = str(row.get("替换词", "")).strip()
+        Args:
+            df: 包含"敏感词"列（可选"替换词"列）的DataFrame
+            progress_callback: 进度回调 (当前步骤, 总步骤数, 提示文本)
+        """
+        def report(step, message):
+            if progress_callback:
+                progress_callback(step, self.IMPORT_STEPS, message)
 
-                if not word:
-                    continue
+        # 检查是否包含"敏感词"列
+        if "敏感词" not in df.columns:
+            return False, "文件必须包含'敏感词'列"
 
-                # 如果已存在则跳过
-                if word in self.sensitive_words:
-                    continue
+        with self._write_lock:
+            return self._import_dataframe_locked(df, report)
+
+    def _import_dataframe_locked(self, df, report):
+        """持有写锁时执行的批量导入主体"""
+        try:
+            report(1, f"正在校验 {len(df)} 条记录...")
+            # 处理空值并去除首尾空白
+            words = df["敏感词"].fillna("").astype(str).str.strip()
+            if "替换词" in df.columns:
+                replacements = df["替换词"].fillna("").astype(str).str.strip()
+            else:
+                replacements = pd.Series("", index=df.index)
 
-                # 添加敏感词
-                self.add_sensitive_word(word, replacement)
-                count += 1
+            frame = pd.DataFrame({"word": words, "replacement": replacements})
+            # 去掉空词、文件内重复词以及已存在的敏感词
+            frame = frame[frame["word"] != ""]
+            frame = frame.drop_duplicates(subset="word", keep="first")
+            frame = frame[~frame["word"].isin(list(self.sensitive_words))]
 
-            self._sort_sensitive_words()
+            if frame.empty:
+                return True, "成功导入 0 个敏感词"
+
+            # 为未提供替换词的敏感词批量生成替换词
+            blank = (frame["replacement"] == "").to_numpy()
+            if blank.any():
+                frame.loc[blank, "replacement"] = self._generate_replacements(int(blank.sum()))
+
+            report(2, f"正在排序并编译 {len(frame)} 个新敏感词...")
+            words = dict(self.sensitive_words)
+            words.update(zip(frame["word"], frame["replacement"]))
+            self._publish(words)
+            self._compile_patterns()
+
+            report(3, "正在保存敏感词...")
             self.save_sensitive_words()
-            return True, f"成功导入 {count} 个敏感词"
+
+            report(self.IMPORT_STEPS, "导入完成")
+            return True, f"成功导入 {len(frame)} 个敏感词"
         except Exception as e:
             return False, f"导入失败: {str(e)}"
 
@@ -226,57 +393,53 @@ class SensitiveWordProcessor:
         except Exception as e:
             return False, f"导出失败: {str(e)}"
 
-    def replace_sensitive_words(self, text):
-        """替换文本中的敏感词，包括抬头部分"""
-        if not text or not isinstance(text, str) or not self.sensitive_words:
-            return text, {}
-
-        replaced_text = text
-        replace_count = {}
-
-        # 使用预编译的正则表达式
-        for word, (pattern, replacement) in self.compiled_patterns.items():
-            try:
-                # 执行替换并计数
-                temp_text, count = pattern.subn(replacement, replaced_text)
+    def replace_sensitive_words(self, text, snapshot=None):
+        """替换文本中的敏感词，包括抬头部分
 
-                if count > 0:
-                    replace_count[word] = replace_count.get(word, 0) + count
-                    replaced_text = temp_text
-
-            except Exception as e:
-                print(f"替换敏感词'{word}'时出错: {str(e)}")
+        Args:
+            snapshot: 使用的词典快照，默认取当前快照；长任务应传入开始时取得的快照以保证前后一致
+        """
+        if snapshot is None:
+            snapshot = self.snapshot
+        if not text or not isinstance(text, str) or not snapshot:
+            return text, {}
 
-        return replaced_text, replace_count
+        # 单次扫描，重叠时长敏感词优先
+        return snapshot.replace(text)
 
-    def restore_sensitive_words(self, text):
-        """将文本中的替换词还原为原始敏感词，优化为单次遍历"""
-        if not text or not isinstance(text, str) or not self.replacement_map:
+    def restore_sensitive_words(self, text, snapshot=None):
+        """将文本中的替换词还原为原始敏感词，使用快照缓存的还原自动机单次遍历"""
+        if snapshot is None:
+            snapshot = self.snapshot
+        if not text or not isinstance(text, str) or not snapshot:
             return text
 
-        restored_text = text
-        replace_count = {}
-
-        # 1. 构建替换词的合并正则模式（长替换词优先）
-        sorted_replacements = sorted(
-            self.replacement_map.items(),
-            key=lambda x: len(x[0]),
-            reverse=True
-        )
-        if sorted_replacements:
-            escaped_replacements = [re.escape(rep) for rep, _ in sorted_replacements]
-            combined_pattern = re.compile('|'.join(escaped_replacements), re.IGNORECASE | re.MULTILINE)
-
-            # 2. 单次遍历还原
-            def restore_callback(match):
-                matched_rep = match.group()
-                original_word = self.replacement_map[matched_rep]
-                replace_count[matched_rep] = replace_count.get(matched_rep, 0) + 1
-                return original_word
-
-            restored_text = combined_pattern.sub(restore_callback, text)
-
-        return restored_text
+        return snapshot.restore(text)
+
+    def restore_sensitive_words_bulk(self, texts, snapshot=None):
+        """批量还原Series或字符串列表，相同文本只还原一次，返回与输入同类型的结果"""
+        if snapshot is None:
+            snapshot = self.snapshot
+        if isinstance(texts, pd.Series):
+            is_text = texts.map(lambda x: isinstance(x, str))
+            if not is_text.any():
+                return texts.copy()
+            unique_texts = pd.unique(texts[is_text])
+            restored = {t: self.restore_sensitive_words(t, snapshot) for t in unique_texts}
+            result = texts.copy()
+            result[is_text] = texts[is_text].map(restored)
+            return result
+
+        restored = {}
+        results = []
+        for text in texts:
+            if isinstance(text, str):
+                if text not in restored:
+                    restored[text] = self.restore_sensitive_words(text, snapshot)
+                results.append(restored[text])
+            else:
+                results.append(text)
+        return results
 
     def get_all_sensitive_words(self):
         """获取所有敏感词列表"""
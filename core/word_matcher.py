@@ -0,0 +1,238 @@
+from types import MappingProxyType
+
+
+class AhoCorasickMatcher:
+    """Aho-Corasick多模式匹配自动机：一次扫描文本即可找出全部敏感词"""
+
+    def __init__(self, mapping, ignore_case=False):
+        """
+        Args:
+            mapping: {敏感词: 替换词}，空敏感词会被忽略
+            ignore_case: 是否忽略大小写（键冲突时保留先出现者）
+        """
+        self.ignore_case = ignore_case
+        self.mapping = {}
+        for word, rep in mapping.items():
+            if word:
+                self.mapping.setdefault(self._fold(word) if ignore_case else word, rep)
+        # 节点以下标表示：goto为字符转移表，fail为失败指针，
+        # output为在该节点结束的敏感词，output_link指向失败链上最近的输出节点
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self._output_link = [0]
+        self._build()
+
+    def __len__(self):
+        return len(self.mapping)
+
+    @staticmethod
+    def _fold(text):
+        """转为小写且保持长度不变，保证匹配位置可映射回原文"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+    def _build(self):
+        """构建字典树并按层序计算失败指针"""
+        goto, output = self._goto, self._output
+        for word in self.mapping:
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    output.append(None)
+                node = nxt
+            output[node] = word
+
+        self._fail = fail = [0] * len(goto)
+        self._output_link = output_link = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target
+                output_link[child] = target if output[target] is not None else output_link[target]
+
+    def find_matches(self, text):
+        """单次扫描返回所有（可能重叠的）匹配 [(起始, 结束, 敏感词)]，按结束位置排序"""
+        if self.ignore_case:
+            text = self._fold(text)
+        goto, fail = self._goto, self._fail
+        output, output_link = self._output, self._output_link
+        root = goto[0]
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            if node == 0:
+                node = root.get(ch, 0)
+                if node == 0:
+                    continue
+            else:
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+            hit = node if output[node] is not None else output_link[node]
+            while hit:
+                word = output[hit]
+                matches.append((i + 1 - len(word), i + 1, word))
+                hit = output_link[hit]
+        return matches
+
+    @staticmethod
+    def select_matches(matches, text_length):
+        """冲突消解：长匹配优先，同长度时靠前者优先，返回按位置排序的不重叠匹配
+
+        matches中每项以 (起始, 结束, ...) 开头，其余字段原样保留
+        """
+        if len(matches) < 2:
+            return matches
+
+        ordered = sorted(matches)
+        last_end = -1
+        for match in ordered:
+            if match[0] < last_end:
+                break
+            last_end = match[1]
+        else:
+            return ordered  # 无重叠，直接使用
+
+        ordered.sort(key=lambda m: (m[0] - m[1], m[0]))
+        taken = bytearray(text_length)
+        selected = []
+        for match in ordered:
+            start, end = match[0], match[1]
+            if taken.find(1, start, end) == -1:
+                taken[start:end] = b'\x01' * (end - start)
+                selected.append(match)
+        selected.sort()
+        return selected
+
+    def replace(self, text):
+        """替换文本中的全部敏感词，返回 (替换后文本, {敏感词: 次数})"""
+        if not text or not self.mapping:
+            return text, {}
+
+        matches = self.select_matches(self.find_matches(text), len(text))
+        if not matches:
+            return text, {}
+
+        mapping = self.mapping
+        return apply_matches(text, [(start, end, word, mapping[word]) for start, end, word in matches])
+
+
+def apply_matches(text, matches):
+    """按已排序且不重叠的 [(起始, 结束, 原值, 替换值)] 重建文本，返回 (替换后文本, {原值: 次数})"""
+    parts = []
+    replace_count = {}
+    pos = 0
+    for start, end, key, replacement in matches:
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        replace_count[key] = replace_count.get(key, 0) + 1
+        pos = end
+    parts.append(text[pos:])
+    return ''.join(parts), replace_count
+
+
+class MatcherSnapshot:
+    """不可变的敏感词词典快照
+
+    词典变更时构建新快照并整体替换（写时复制），运行中的任务继续持有开始时的快照，
+    读取路径无需加锁。匹配自动机在首次使用时构建，并发重复构建的结果相同，不影响正确性。
+    """
+
+    def __init__(self, version, sensitive_words, matcher=None, restore_matcher=None, detector=None):
+        """
+        Args:
+            version: 快照版本号，每次发布递增
+            sensitive_words: 已排序的 {敏感词: 替换词}，由快照独占，调用方之后不得再修改
+            matcher/restore_matcher: 可选的已构建自动机（如从预编译快照恢复）
+            detector: 可选的PatternDetector，与词典在同一次替换中生效
+        """
+        self.version = version
+        self._words = sensitive_words
+        self.sensitive_words = MappingProxyType(sensitive_words)
+        self.replacement_map = MappingProxyType({v: k for k, v in sensitive_words.items()})
+        self._matcher = matcher
+        self._restore_matcher = restore_matcher
+        self.detector = detector
+
+    def __reduce__(self):
+        # 只读映射视图无法直接序列化，按构造参数重建
+        return MatcherSnapshot, (self.version, self._words, self._matcher,
+                                 self._restore_matcher, self.detector)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __bool__(self):
+        return bool(self._words) or bool(self.detector)
+
+    def without_detector(self):
+        """去掉检测器的副本，用于写入磁盘（检测器含密钥，按当前配置重新挂载）"""
+        return MatcherSnapshot(self.version, self._words, self._matcher, self._restore_matcher)
+
+    def with_version(self, version, detector=None):
+        """以新版本号重新发布同一份内容（复用已构建的自动机），可同时更换检测器"""
+        return MatcherSnapshot(version, self._words, self._matcher, self._restore_matcher,
+                               detector if detector is not None else self.detector)
+
+    @property
+    def matcher(self):
+        """敏感词替换自动机"""
+        if self._matcher is None:
+            self._matcher = AhoCorasickMatcher(self._words)
+        return self._matcher
+
+    @property
+    def restore_matcher(self):
+        """替换词还原自动机（忽略大小写，长替换词优先）"""
+        if self._restore_matcher is None:
+            sorted_replacements = sorted(
+                self.replacement_map.items(),
+                key=lambda x: len(x[0]),
+                reverse=True
+            )
+            self._restore_matcher = AhoCorasickMatcher(dict(sorted_replacements), ignore_case=True)
+        return self._restore_matcher
+
+    def compile(self):
+        """立即构建两个自动机，返回自身"""
+        self.matcher
+        self.restore_matcher
+        return self
+
+    def replace(self, text):
+        """替换敏感词与检测到的敏感模式，返回 (替换后文本, {敏感词或命中值: 次数})"""
+        detected = self.detector.find_matches(text) if self.detector else []
+        if not detected:
+            if not self._words:
+                return text, {}
+            return self.matcher.replace(text)
+
+        # 词典命中与模式命中合并后统一消解冲突，一次重建输出；范围完全相同时以词典为准
+        matches = []
+        if self._words:
+            mapping = self._words
+            matches = [(start, end, word, mapping[word])
+                       for start, end, word in self.matcher.find_matches(text)]
+            spans = {(m[0], m[1]) for m in matches}
+            detected = [m for m in detected if (m[0], m[1]) not in spans]
+        return apply_matches(text, AhoCorasickMatcher.select_matches(matches + detected, len(text)))
+
+    def restore(self, text):
+        """将替换词与模式假名还原为原始值"""
+        if self._words:
+            text, _ = self.restore_matcher.replace(text)
+        if self.detector:
+            text = self.detector.restore(text)
+        return text
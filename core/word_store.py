@@ -0,0 +1,84 @@
+import os
+import json
+
+
+class JournalWordStore:
+    """敏感词持久化：JSON快照 + 追加写日志
+
+    每次增删改只向日志追加一行（一行即一个事务，可包含多个操作），
+    日志条目过多时把完整词典原子地写回快照并清空日志。
+    """
+
+    COMPACT_THRESHOLD = 1000  # 日志条目数超过该值时触发压缩
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + '.journal'
+        self.journal_entries = 0
+
+    def load(self):
+        """读取快照并重放日志，返回 {敏感词: 替换词}"""
+        words = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                words = json.load(f)
+
+        self.journal_entries = 0
+        if not os.path.exists(self.journal_path):
+            return words
+
+        valid_length = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                # 崩溃时可能留下不完整的末行：缺少换行或无法解析的记录及其后内容全部丢弃
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    break
+                self._apply(words, record.get("ops", []))
+                valid_length += len(line)
+                self.journal_entries += 1
+
+        # 截掉损坏的尾部，保证后续追加的记录可被读取
+        if valid_length != os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_length)
+        return words
+
+    @staticmethod
+    def _apply(words, ops):
+        for op in ops:
+            if op[0] == "set":
+                words[op[1]] = op[2]
+            elif op[0] == "del":
+                words.pop(op[1], None)
+
+    def append(self, ops):
+        """追加一个事务，ops为 [("set", 敏感词, 替换词)] 或 [("del", 敏感词)] 组成的列表"""
+        line = json.dumps({"ops": [list(op) for op in ops]}, ensure_ascii=False) + "\n"
+        with open(self.journal_path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_entries += 1
+
+    def needs_compaction(self):
+        return self.journal_entries >= self.COMPACT_THRESHOLD
+
+    def compact(self, words):
+        """原子地写入完整快照（临时文件 + os.replace）并清空日志"""
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(words, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # 快照已包含日志中的全部变更；即使清空前崩溃，重放幂等的日志也不会改变结果
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'wb') as f:
+                f.flush()
+                os.fsync(f.fileno())
+        self.journal_entries = 0
@@ -1,11 +1,14 @@
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import LogAnalyzerGUI
 from utils.config import Config
 
 
 def main():
+    # 并行去敏使用进程池，打包为可执行文件时需要
+    multiprocessing.freeze_support()
     config = Config()
     config.load()
 
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
 from utils.helpers import show_info_message, show_error_message
 import os
 from core.api_client import DeepSeekAPI
+from core.line_index import index_cache_size, clear_index_cache
 
 class ConfigTab(QWidget):
     def __init__(self, config, parent=None):
@@ -61,10 +62,51 @@ class ConfigTab(QWidget):
         other_layout.addLayout(data_dir_layout)
         other_layout.addLayout(save_dir_layout)
 
+        # 解析缓存
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(QLabel("解析缓存:"))
+
+        self.cache_size_label = QLabel()
+        cache_layout.addWidget(self.cache_size_label)
+        cache_layout.addStretch()
+
+        self.clear_cache_btn = QPushButton("清空缓存")
+        self.clear_cache_btn.clicked.connect(self.clear_parse_cache)
+        cache_layout.addWidget(self.clear_cache_btn)
+
+        other_layout.addLayout(cache_layout)
+        self.update_cache_size()
+
         layout.addWidget(api_group)
         layout.addWidget(other_group)
         layout.addStretch()
 
+    def get_parse_cache(self):
+        processor = getattr(self.parent, 'processor', None)
+        return getattr(processor, 'parse_cache', None)
+
+    def update_cache_size(self):
+        # 解析结果缓存与TXT/LOG行索引一并统计
+        parse_cache = self.get_parse_cache()
+        parsed = "未启用" if parse_cache is None else f"{parse_cache.size() / 1024 / 1024:.1f} MB"
+        self.cache_size_label.setText(f"解析结果 {parsed}, 行索引 {index_cache_size() / 1024 / 1024:.1f} MB")
+
+    def showEvent(self, event):
+        # 切换到本页时刷新缓存占用
+        super().showEvent(event)
+        self.update_cache_size()
+
+    def clear_parse_cache(self):
+        parse_cache = self.get_parse_cache()
+        try:
+            if parse_cache is not None:
+                parse_cache.clear()
+            clear_index_cache()
+            self.update_cache_size()
+            show_info_message(self, "成功", "解析缓存与行索引已清空")
+        except Exception as e:
+            show_error_message(self, "错误", f"清空缓存失败: {str(e)}")
+
     def save_api_key(self):
         api_key = self.api_key_edit.text().strip()
         self.config.set("api_key", api_key)
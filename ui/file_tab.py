@@ -1,16 +1,20 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
                              QPushButton, QListWidget, QGroupBox, QSplitter,
                              QFileDialog, QListWidgetItem, QMessageBox, )
-from PyQt5.QtCore import (Qt, QTimer)
+from PyQt5.QtCore import (Qt, QTimer, QFileSystemWatcher)
 from PyQt5.QtWidgets import QFileIconProvider
 import os
+import time
 import shutil
-from utils.helpers import get_file_list, show_info_message, show_error_message
+from utils.helpers import show_info_message, show_error_message
+from core.file_catalog import FileCatalog
 from ui.sensitive_tab import ProgressDialog  # 导入新类
 from PyQt5.QtCore import QThread, pyqtSignal
 
 
 class FileTab(QWidget):
+    REFRESH_DELAY_MS = 500  # 目录变化后延迟刷新，合并短时间内的连续变化
+
     def __init__(self, processor, config, parent=None):
         super().__init__(parent)
         self.processor = processor
@@ -18,6 +22,19 @@ class FileTab(QWidget):
         self.selected_files = []
         self.parent = parent  # 保存父窗口引用
         self.current_data_dir = self.config.get("data_dir")
+
+        # 文件目录在后台线程中扫描，列表按增删结果增量更新
+        self.catalog = None
+        self.file_items = {}  # {文件名: 列表项}
+        self.scan_thread = None
+        self.rescan_pending = False
+        self.file_icon = QFileIconProvider().icon(QFileIconProvider.File)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.schedule_refresh)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(self.REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.update_file_list)
         self.init_ui()
 
     def init_ui(self):
@@ -69,6 +86,7 @@ class FileTab(QWidget):
 
         self.file_list = QListWidget()
         self.file_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.file_list.setSortingEnabled(True)
         list_layout.addWidget(self.file_list)
 
         # 已选文件区域
@@ -136,9 +154,10 @@ class FileTab(QWidget):
         supported_exts = [
             "CSV文件 (*.csv)",
             "Excel文件 (*.xlsx *.xls)",
-            "JSON文件 (*.json)",
+            "JSON文件 (*.json *.jsonl *.ndjson)",
             "文本日志 (*.txt *.log)",
-            "所有支持的文件 (*.csv *.xlsx *.xls *.json *.txt *.log)",
+            "压缩日志 (*.gz *.bz2 *.xz)",
+            "所有支持的文件 (*.csv *.xlsx *.xls *.json *.jsonl *.ndjson *.txt *.log *.gz *.bz2 *.xz)",
             "所有文件 (*)"
         ]
         file_filter = ";;".join(supported_exts)
@@ -183,21 +202,92 @@ class FileTab(QWidget):
                 self.update_file_list()
 
     def update_file_list(self):
-        """更新当前数据目录中的文件列表"""
+        """在后台扫描当前数据目录，扫描结果到达后增量更新文件列表"""
+        if not self.current_data_dir or not os.path.isdir(self.current_data_dir):
+            self.reset_catalog(None)
+            return
+        if self.catalog is None or self.catalog.directory != self.current_data_dir:
+            self.reset_catalog(self.current_data_dir)
+
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            # 正在扫描，结束后再扫描一次
+            self.rescan_pending = True
+            return
+
+        self.scan_thread = CatalogScanThread(self.catalog)
+        self.scan_thread.changes_signal.connect(self.apply_catalog_changes)
+        self.scan_thread.error_signal.connect(
+            lambda msg: show_error_message(self, "警告", f"加载文件列表失败: {msg}"))
+        self.scan_thread.finished.connect(self.on_scan_finished)
+        self.scan_thread.start()
+
+    def reset_catalog(self, directory):
+        """切换数据目录：清空列表并改为监视新目录"""
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
         self.file_list.clear()
-        try:
-            # 读取当前数据目录中的文件
-            files = get_file_list(self.current_data_dir)
-            icon_provider = QFileIconProvider()
+        self.file_items = {}
+        self.catalog = None
+        if directory:
+            self.catalog = FileCatalog(directory)
+            self.watcher.addPath(directory)
+
+    def schedule_refresh(self, _path=None):
+        """目录内容变化（文件增删、改名）时延迟刷新"""
+        self.refresh_timer.start()
+
+    def stop_scan(self):
+        """停止后台扫描并等待线程结束（关闭窗口时调用）；正在估算行数时在当前批次后结束"""
+        self.refresh_timer.stop()
+        self.rescan_pending = False
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.requestInterruption()
+            self.scan_thread.wait()
+
+    def on_scan_finished(self):
+        if self.rescan_pending:
+            self.rescan_pending = False
+            self.update_file_list()
 
-            for file in files:
-                item = QListWidgetItem(icon_provider.icon(QFileIconProvider.File), file)
-                self.file_list.addItem(item)
+    def apply_catalog_changes(self, catalog, changes):
+        """按扫描结果增删列表项，已有项（及其选中状态）保持不变"""
+        if catalog is not self.catalog:
+            # 切换目录前发起的扫描（即使又切回原目录，也已换成新的文件目录对象）
+            return
 
-            if self.parent:
-                self.parent.statusBar().showMessage(f"已加载 {len(files)} 个文件")
-        except Exception as e:
-            show_error_message(self, "警告", f"加载文件列表失败: {str(e)}")
+        self.file_list.setUpdatesEnabled(False)
+        try:
+            for name in changes["removed"]:
+                item = self.file_items.pop(name, None)
+                if item is not None:
+                    self.file_list.takeItem(self.file_list.row(item))
+            for name in sorted(changes["added"]):
+                item = QListWidgetItem(self.file_icon, name)
+                item.setToolTip(self.describe_file(changes["added"][name]))
+                self.file_list.addItem(item)
+                self.file_items[name] = item
+            for name, info in changes["updated"].items():
+                item = self.file_items.get(name)
+                if item is not None:
+                    item.setToolTip(self.describe_file(info))
+        finally:
+            self.file_list.setUpdatesEnabled(True)
+
+        if self.parent and (changes["added"] or changes["removed"]):
+            self.parent.statusBar().showMessage(f"已加载 {len(self.file_items)} 个文件")
+
+    @staticmethod
+    def describe_file(info):
+        """列表项提示：大小、修改时间、格式与估算行数"""
+        file_format = info["format"] or "未知"
+        if info["compression"]:
+            file_format += f" ({info['compression']}压缩)"
+        text = (f"大小: {info['size'] / 1024:.1f} KB\n"
+                f"修改时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['mtime'] / 1e9))}\n"
+                f"格式: {file_format}")
+        if info.get("rows") is not None:
+            text += f"\n估算行数: {info['rows']}"
+        return text
 
     def add_files(self):
         """添加文件到选择列表"""
@@ -261,8 +351,8 @@ class FileTab(QWidget):
         if not save_dir:
             return
 
-        # 创建进度对话框
-        progress_dialog = ProgressDialog("正在进行去敏处理", len(self.selected_files), self)
+        # 创建进度对话框（按块汇报，进度以千分比表示）
+        progress_dialog = ProgressDialog("正在进行去敏处理", AnonymizeThread.PROGRESS_SCALE, self)
         progress_dialog.show()
 
         # 创建并启动去敏线程
@@ -271,7 +361,7 @@ class FileTab(QWidget):
             self.selected_files,
             save_dir
         )
-        self.anonymize_thread.update_signal.connect(progress_dialog.update_progress)
+        self.anonymize_thread.progress_signal.connect(progress_dialog.set_progress)
         self.anonymize_thread.complete_signal.connect(lambda res: self.on_anonymize_complete(res, progress_dialog))
         self.anonymize_thread.start()
 
@@ -295,45 +385,57 @@ class FileTab(QWidget):
         # 延迟关闭进度对话框
         QTimer.singleShot(1000, progress_dialog.close)
 
+class CatalogScanThread(QThread):
+    """后台扫描数据目录：先汇报文件增删，再分批估算新文件的行数"""
+    changes_signal = pyqtSignal(object, dict)  # (扫描的FileCatalog, {"added", "updated", "removed"})
+    error_signal = pyqtSignal(str)
+
+    ESTIMATE_BATCH = 500  # 每估算多少个文件汇报一次
+
+    def __init__(self, catalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def run(self):
+        try:
+            self.changes_signal.emit(self.catalog, self.catalog.scan())
+
+            pending = self.catalog.pending_estimates()
+            for start in range(0, len(pending), self.ESTIMATE_BATCH):
+                if self.isInterruptionRequested():
+                    break
+                updated = self.catalog.estimate_rows(pending[start:start + self.ESTIMATE_BATCH])
+                self.changes_signal.emit(self.catalog, {"added": {}, "updated": updated, "removed": []})
+            self.catalog.save()
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+
 # 添加去敏处理线程
 class AnonymizeThread(QThread):
-    update_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int, str)  # (千分比进度, 提示文本)
     complete_signal = pyqtSignal(dict)
 
+    PROGRESS_SCALE = 1000
+
     def __init__(self, processor, file_names, output_dir):
         super().__init__()
         self.processor = processor
         self.file_names = file_names
         self.output_dir = output_dir
 
+    def on_progress(self, done_bytes, total_bytes, filename):
+        """按块汇报进度（由去敏管道回调）"""
+        value = int(done_bytes * self.PROGRESS_SCALE / total_bytes) if total_bytes else 0
+        self.progress_signal.emit(value, f"正在处理: {filename} ({value / 10:.1f}%)")
+
     def run(self):
         try:
-            results = {}
-            for filename in self.file_names:
-                self.update_signal.emit(filename)
-                # 单文件处理逻辑（从process_and_anonymize_files拆分）
-                data_dict = self.processor._load_file_data([filename])
-                for fname, df in data_dict.items():
-                    anonymized_df = self.processor._anonymize_dataframe(df)
-                    base_name = os.path.splitext(fname)[0]
-                    ext = os.path.splitext(fname)[1]
-                    output_path = os.path.join(
-                        self.output_dir,
-                        f"{base_name}_anonymized{ext}"
-                    )
-
-                    # 保存文件
-                    if ext.lower() in ['.csv']:
-                        anonymized_df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                    elif ext.lower() in ['.xlsx', '.xls']:
-                        anonymized_df.to_excel(output_path, index=False)
-                    elif ext.lower() in ['.json']:
-                        anonymized_df.to_json(output_path, orient='records', force_ascii=False)
-                    else:
-                        content = "\n".join(anonymized_df.iloc[:, 0].astype(str).tolist())
-                        with open(output_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                    results[fname] = output_path
+            results = self.processor.process_and_anonymize_files(
+                self.file_names,
+                self.output_dir,
+                progress_callback=self.on_progress
+            )
             self.complete_signal.emit({"status": "success", "results": results})
         except Exception as e:
             self.complete_signal.emit({"status": "error", "message": str(e)})
@@ -73,6 +73,11 @@ class LogAnalyzerGUI(QMainWindow):
         else:
             print(f"警告：图标文件不存在 - {icon_path}")
 
+    def closeEvent(self, event):
+        # 等待后台扫描线程结束，避免线程仍在运行时被销毁
+        self.file_tab.stop_scan()
+        super().closeEvent(event)
+
     def set_analysis_result(self, result):
         """将分析结果传递给结果标签页"""
         self.results_tab.set_result(result)
\ No newline at end of file
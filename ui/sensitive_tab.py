@@ -5,7 +5,7 @@ from PyQt5.QtCore import Qt
 import os
 from utils.helpers import show_info_message, show_error_message
 from PyQt5.QtWidgets import QDialog, QProgressBar, QVBoxLayout, QLabel
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 
 
 class SensitiveWordTab(QWidget):
@@ -196,10 +196,26 @@ class SensitiveWordTab(QWidget):
         )
 
         if file_path:
-            success, msg = self.sensitive_processor.import_from_file(file_path)
-            if success:
-                self.refresh_table()
-            show_info_message(self, "导入结果", msg)
+            # 在后台线程中批量导入，避免大词表冻结界面
+            progress_dialog = ProgressDialog("正在导入敏感词", self.sensitive_processor.IMPORT_STEPS, self)
+            progress_dialog.show()
+            self.import_btn.setEnabled(False)
+
+            self.import_thread = ImportWordsThread(self.sensitive_processor, file_path)
+            self.import_thread.progress_signal.connect(progress_dialog.set_progress)
+            self.import_thread.complete_signal.connect(
+                lambda res: self.on_import_complete(res, progress_dialog)
+            )
+            self.import_thread.start()
+
+    def on_import_complete(self, result, progress_dialog):
+        """导入完成后的处理"""
+        progress_dialog.complete()
+        self.import_btn.setEnabled(True)
+        if result["status"] == "success":
+            self.refresh_table()
+        show_info_message(self, "导入结果", result["message"])
+        QTimer.singleShot(1000, progress_dialog.close)
 
     def export_words(self):
         """导出敏感词"""
@@ -217,6 +233,26 @@ class SensitiveWordTab(QWidget):
             show_info_message(self, "导出结果", msg)
 
 
+class ImportWordsThread(QThread):
+    progress_signal = pyqtSignal(int, str)  # (当前步骤, 提示文本)
+    complete_signal = pyqtSignal(dict)
+
+    def __init__(self, sensitive_processor, file_path):
+        super().__init__()
+        self.sensitive_processor = sensitive_processor
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            success, msg = self.sensitive_processor.import_from_file(
+                self.file_path,
+                progress_callback=lambda step, total, text: self.progress_signal.emit(step, text)
+            )
+            self.complete_signal.emit({"status": "success" if success else "error", "message": msg})
+        except Exception as e:
+            self.complete_signal.emit({"status": "error", "message": f"导入失败: {str(e)}"})
+
+
 class ProgressDialog(QDialog):
     def __init__(self, title, total_files, parent=None):
         super().__init__(parent)
@@ -243,6 +279,13 @@ class ProgressDialog(QDialog):
         # 处理UI事件，防止界面冻结
         QApplication.processEvents()
 
+    def set_progress(self, value, text):
+        """按绝对进度值更新（用于按块汇报的任务）"""
+        self.current = value
+        self.label.setText(text)
+        self.progress_bar.setValue(min(value, self.total))
+        QApplication.processEvents()
+
     def complete(self):
         self.label.setText("处理完成!")
         self.progress_bar.setValue(self.total)
\ No newline at end of file
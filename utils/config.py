@@ -10,7 +10,26 @@ class Config:
             "api_key": "",
             "data_dir": "",
             "save_dir": "",
-            "verbose_logging": False
+            "verbose_logging": False,
+            "stream_anonymize": True,  # CSV/TXT/LOG按块流式去敏
+            "anonymize_chunk_size": 50000,  # 流式去敏每块行数，决定峰值内存
+            "anonymize_workers": 1,  # 并行去敏进程数，1表示单进程（默认），0表示使用全部CPU核
+            # 内置敏感模式检测，可选 token_url/email/mac/ipv6/ipv4/id_card/mobile，空列表表示关闭（默认）
+            "pattern_detectors": [],
+            "pseudonym_index": False,  # 是否把模式假名写入磁盘反查索引，用于还原较早生成的假名
+            "memory_cache_mb": 1024,  # 已加载文件的内存缓存预算（MB），超出时淘汰最久未使用的文件
+            "parse_cache": True,  # 缓存文件解析结果，文件未变化时直接加载
+            "parse_cache_mb": 2048,  # 解析缓存容量上限（MB），超出时淘汰最久未使用的条目
+            "line_index_cache_mb": 512,  # 文本行索引缓存容量上限（MB），超出时淘汰最久未使用的索引
+            "parse_log_formats": True,  # 加载时识别syslog/combined/key=value/Windows事件格式并拆分为带类型的列
+            "optimize_dtypes": False,  # 加载后压缩列类型：低基数文本转分类、浮点无损降位、时间文本解析为日期类型
+            "category_max_ratio": 0.5,  # 唯一值占比不超过该值的文本列转为分类类型
+            "downcast_integers": False,  # 类型压缩时把整数列降为int8/int16/int32（生成的代码做累加等运算时可能溢出）
+            "load_in_processes": False,  # 多个文件时用进程池并行解析（解析大量文件时可随CPU核数扩展）
+            "load_workers": 0,  # 进程池加载的进程数，0表示使用全部CPU核
+            "parallel_parse_mb": 256,  # CSV/TXT/LOG文件不小于该大小（MB）时分段并行解析，0表示关闭
+            "excel_sheets": "first",  # Excel加载的工作表：first(第一个)/all(全部，按 文件名#工作表 分别加载)
+            "csv_engine": "auto"  # CSV解析器：auto(C解析器)/pyarrow(多线程，需安装pyarrow，时间列解析为日期类型)/c/python
         }
         self.load()
         if self.config["data_dir"]:
@@ -2,6 +2,9 @@ import os
 import re
 from PyQt5.QtWidgets import QMessageBox
 
+# 支持透明解压的压缩扩展名（如 app.log.gz 按内层的 .log 处理）
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz')
+
 
 def show_error_message(parent, title, message):
     """显示错误消息框"""
@@ -19,15 +22,32 @@ def get_file_list(directory):
         return []
 
     try:
-        # 只返回文件，不返回目录
-        return [f for f in os.listdir(directory)
-                if os.path.isfile(os.path.join(directory, f))
-                and not f.startswith('.')]
+        # 只返回文件，不返回目录；scandir 遍历时已带有文件类型，无需逐个stat
+        with os.scandir(directory) as entries:
+            return [entry.name for entry in entries
+                    if not entry.name.startswith('.') and entry.is_file()]
     except Exception as e:
         print(f"获取文件列表失败: {str(e)}")
         return []
 
 
+def split_extension(file_name):
+    """返回 (内层扩展名, 压缩扩展名)，均为小写；如 app.log.gz -> ('.log', '.gz')，未压缩时压缩扩展名为空"""
+    root, ext = os.path.splitext(file_name)
+    ext = ext.lower()
+    if ext in COMPRESSED_EXTENSIONS:
+        return os.path.splitext(root)[1].lower(), ext
+    return ext, ''
+
+
+def get_cache_dir(*parts):
+    """获取项目缓存目录（不存在则创建），可传入子目录名"""
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cache_dir = os.path.join(root_dir, 'cache', *parts)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
 def sanitize_filename(filename):
     """清理文件名"""
     safe_name = re.sub(r'[\\/*?:"<>|]', "", filename)
@@ -64,9 +84,9 @@ def is_valid_file(file_path):
         return False, "文件为空"
 
     # 检查扩展名（可扩展）
-    supported_exts = {'.csv', '.xlsx', '.xls', '.json', '.txt', '.log'}
-    _, ext = os.path.splitext(file_path)
-    if ext.lower() not in supported_exts:
+    supported_exts = {'.csv', '.xlsx', '.xls', '.json', '.jsonl', '.ndjson', '.txt', '.log'}
+    ext, _ = split_extension(file_path)
+    if ext not in supported_exts:
         return False, f"不支持的文件格式: {ext}。支持: {', '.join(supported_exts)}"
 
     return True, "有效的文件"
\ No newline at end of file